@@ -0,0 +1,51 @@
+"""Compare the throughput (MB/s) of the graminput tokenizer with the old per-character classifier"""
+
+import argparse
+import io
+import time
+
+from text_to_network_input import tokenize, WORD_CHARS, GERMAN, UNICODE
+
+ap = argparse.ArgumentParser(description='Benchmark the graminput tokenizer on a text file')
+ap.add_argument('filename', help='plain text file, e.g. a novel')
+ap.add_argument('--repeat', type=int, default=5, help='number of runs, the fastest one is reported')
+
+def tokenize_per_character(text):
+    """The former classifier: every character is looked up in the WORD_CHARS string"""
+    for word in text.split():
+        i = 0
+        last_i = 0
+        while i < len(word):
+            if word[i] not in WORD_CHARS:
+                if word[last_i:i] != "":
+                    yield "(w " + word[last_i:i] + ")"
+                yield "(c " + ("[" if word[i] == "(" else ("]" if word[i] == ")" else word[i])) + ")"
+                last_i = i+1
+            i += 1
+        if word[last_i:i] != '':
+            yield "(w " + word[last_i:i] + ")"
+
+def best_time(run, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    with open(args.filename, 'r') as txt_file:
+        text = txt_file.read()
+    megabytes = len(text.encode('utf-8')) / 1e6
+    candidates = [
+        ('per-character', lambda: sum(1 for _ in tokenize_per_character(text))),
+        ('table (' + GERMAN + ')', lambda: sum(1 for _ in tokenize(io.StringIO(text), letters=GERMAN))),
+        ('table (' + UNICODE + ')', lambda: sum(1 for _ in tokenize(io.StringIO(text), letters=UNICODE))),
+    ]
+    print('{:20s}|{:>10s}|{:>10s}'.format('classifier', 'seconds', 'MB/s'))
+    print('-' * 42)
+    for name, run in candidates:
+        seconds = best_time(run, args.repeat)
+        print('{:20s}|{:10.3f}|{:10.2f}'.format(name, seconds, megabytes / seconds))
@@ -0,0 +1,105 @@
+"""Evaluate many predictions against their ground truths at once
+
+Every document gets the report of evaluation.py, the documents are scored in
+a process pool. The corpus table at the end has the micro averages (the
+boundaries of all documents counted together) and the macro averages (the
+mean of the per-document percentages, over the documents where the label
+occurs in the ground truth resp. the prediction). Precision and recall are
+defined as in evaluation.py."""
+
+import argparse
+import functools
+import io
+import multiprocessing
+import os
+import sys
+
+import evaluation
+import evaluation_arrays
+
+GROUND_TRUTH_SUFFIX = '_Ground_Truth.txt'
+PREDICT_SUFFIX = '_predict.txt'
+
+ap = argparse.ArgumentParser(description='Evaluate DATANAME_predict.txt against DATANAME_Ground_Truth.txt for many documents')
+ap.add_argument('documents', nargs='*', help='DATANAME of a document, or a directory: all its documents with a ground truth')
+ap.add_argument('--pair', nargs=2, action='append', default=[], metavar=('GROUND_TRUTH', 'PREDICTION'), help='evaluate the prediction file against the ground truth file')
+ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='number of worker processes (default: number of cores)')
+ap.add_argument('--arrays', action='store_true', help='score with evaluation_arrays (NumPy), for very large documents')
+
+def find_pairs(documents, pairs=()):
+    """Return the (ground truth path, prediction path, name) of the documents
+    and directories, followed by the explicit pairs"""
+    found = []
+    for document in documents:
+        if os.path.isdir(document):
+            for name in sorted(os.listdir(document)):
+                if name.endswith(GROUND_TRUTH_SUFFIX):
+                    base = os.path.join(document, name[:-len(GROUND_TRUTH_SUFFIX)])
+                    if os.path.exists(base + PREDICT_SUFFIX):
+                        found.append((base + GROUND_TRUTH_SUFFIX, base + PREDICT_SUFFIX, base))
+        else:
+            found.append((document + GROUND_TRUTH_SUFFIX, document + PREDICT_SUFFIX, document))
+    for ground_truth_path, pred_path in pairs:
+        found.append((ground_truth_path, pred_path, pred_path))
+    return found
+
+def score_document(pair, arrays=False):
+    """Return the report and the evaluation.count_labels counts of a document"""
+    ground_truth_path, pred_path, name = pair
+    report = io.StringIO()
+    if arrays:
+        n_gt, gt_tokens, pred_tokens, counts = evaluation_arrays.score_files(ground_truth_path, pred_path)
+        evaluation.write_counts(n_gt, gt_tokens, pred_tokens, name, counts, report)
+    else:
+        list_gt, list_pred = evaluation.read_files(ground_truth_path, pred_path)
+        counts = evaluation.count_labels(list_gt, list_pred)
+        evaluation.write_report(list_gt, list_pred, name, report, counts)
+    return report.getvalue(), counts
+
+def score_documents(pairs, jobs=1, arrays=False):
+    """Yield score_document of every pair, in order"""
+    score = functools.partial(score_document, arrays=arrays)
+    if jobs <= 1 or len(pairs) <= 1:
+        for pair in pairs:
+            yield score(pair)
+        return
+    with multiprocessing.Pool(min(jobs, len(pairs))) as pool:
+        for result in pool.imap(score, pairs):
+            yield result
+
+def _mean(values):
+    return sum(values) / len(values) if values else 0
+
+def corpus_rows(document_counts):
+    """Return (char, # ground truth, # predictions, micro precision, micro recall,
+    macro precision, macro recall) of every label"""
+    rows = []
+    for char in evaluation.chars:
+        counts = [doc_counts[char] for doc_counts in document_counts]
+        chars_gt, chars_pred, matches = [sum(column) for column in zip(*counts)] if counts else (0, 0, 0)
+        label, chars_gt, chars_pred, prec, rec = evaluation.make_row(char, chars_gt, chars_pred, matches)
+        macro_prec = _mean([found / gt * 100 for gt, pred, found in counts if gt > 0])
+        macro_rec = _mean([found / pred * 100 for gt, pred, found in counts if pred > 0])
+        rows.append((label, chars_gt, chars_pred, prec, rec, macro_prec, macro_rec))
+    return rows
+
+def write_corpus_report(document_counts, out=sys.stdout):
+    out.write("Corpus: " + str(len(document_counts)) + " documents\n")
+    out.write("Token | # Ground Truth | # predictions | % precision | % recall | % macro precision | % macro recall\n")
+    out.write("----------------------------------------------------------------------------------------------------\n")
+    for row in corpus_rows(document_counts):
+        out.write("{:6s}|{:16d}|{:15d}|{:13.3f}|{:10.3f}|{:19.3f}|{:15.3f}".format(*row) + "\n")
+
+def evaluate_corpus(pairs, jobs=1, out=sys.stdout, arrays=False):
+    document_counts = []
+    for report, counts in score_documents(pairs, jobs, arrays):
+        out.write(report + "\n")
+        document_counts.append(counts)
+    write_corpus_report(document_counts, out)
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    pairs = find_pairs(args.documents, args.pair)
+    if len(pairs) == 0:
+        ap.error('no documents to evaluate')
+    evaluate_corpus(pairs, args.jobs, arrays=args.arrays)
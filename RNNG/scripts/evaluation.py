@@ -1,145 +1,185 @@
-from copy import deepcopy
+import argparse
+import sys
+from collections import Counter
 
-file_ground_truth = open("C:/Users/pasca/Dropbox/PaktikumTextimaging/rnng-master/Thomas_Mann_Der_kleine_Herr_Friedemann_Ground_Truth.txt", "r") #Franz_Kafka_Auf_der_Galerie_Quelle_DigBib_Ground_Truth.txt","r") #Franz_Kafka_Das_Urteil_Ground_Truth.txt","r")
-file_pred = open("C:/Users/pasca/Dropbox/PaktikumTextimaging/rnng-master/Thomas_Mann_Der_kleine_Herr_Friedemann_predict.txt", "r") #Franz_Kafka_Auf_der_Galerie_Quelle_DigBib_predict.txt","r") #Franz_Kafka_Das_Urteil_predict.txt", "r")   
 chars = ["(t", "(s", "(seg", "))", "T1","T2","T3","T4","T5","T6"]
 
-def eval_char(list_gt, list_pred, char):
-    chars_gt = 0
-    chars_pred = 0
-    matches = 0
-    char_list = []
-    t_list = ["))",")))","))))",")))))","))))))",")))))))"]
-    
-    for elem in list_gt:
-        if(char[0] == "T"):
-            if((t_list[int(char[1])-1] in elem[0]) and (t_list[int(char[1])] not in elem[0])):
-                chars_gt += 1
-        elif(char == elem[0] or (char in elem[0] and char == "))")):
-            chars_gt += elem[2]
-            
-    for elem in list_pred:
-        if(char[0] == "T"):
-            if((t_list[int(char[1])-1] in elem[0]) and (t_list[int(char[1])] not in elem[0])):
-                chars_pred += 1
-                char_list.append(elem)
-        elif(char == elem[0] or (char in elem[0] and char == "))")):
-            chars_pred += elem[2]
-            char_list.append(elem)
-            
-    gt_copy = deepcopy(list_gt)
-    for elem in char_list:
-        for i in range(len(gt_copy)):
-            if(elem[0] == gt_copy[i][0] and elem[1] == gt_copy[i][1]):
-                if(char[0] == "T"):
-                    matches += 1
-                else:
-                    matches += elem[2] if (elem[2] <= gt_copy[i][2]) else gt_copy[i][2]
-                gt_copy.pop(i)
-                break
-    
+ap = argparse.ArgumentParser(description='Evaluate DATANAME_predict.txt against DATANAME_Ground_Truth.txt')
+ap.add_argument('file', help='DATANAME, i.e. the path of the document without suffix')
+
+# Tk counts the boundaries whose longest run of ")" is k+1 brackets long;
+# longer runs than this are not supported
+MAX_CLOSING_RUN = 6
+
+def closing_run(token):
+    """Return the length of the longest run of ")" in token"""
+    longest = run = 0
+    for char in token:
+        run = run + 1 if char == ")" else 0
+        longest = max(longest, run)
+    return longest
+
+def boundary_labels(token):
+    """Return the labels of chars a boundary token counts for"""
+    labels = []
+    if token in ("(t", "(s", "(seg"):
+        labels.append(token)
+    if "))" in token:
+        labels.append("))")
+    run = closing_run(token)
+    if run > MAX_CLOSING_RUN:
+        raise IndexError("boundary " + token + " has more than " + str(MAX_CLOSING_RUN) + " closing brackets in a row")
+    if run >= 2:
+        labels.append("T" + str(run - 1))
+    return labels
+
+def count_labels(list_gt, list_pred):
+    """Return [# ground truth, # predictions, # matches] of every label of chars
+
+    Both boundary lists are indexed by boundary once. A predicted boundary
+    matches a ground truth boundary with the same token at the same position,
+    each of them matching at most once."""
+    gt_index = Counter(list_gt)
+    pred_index = Counter(list_pred)
+    counts = dict((char, [0, 0, 0]) for char in chars)
+    labels = {}
+    def add(elem, n, column):
+        token = elem[0]
+        if token not in labels:
+            labels[token] = boundary_labels(token)
+        for char in labels[token]:
+            # T labels count boundaries, the others the elements they open or close
+            counts[char][column] += n if char[0] == "T" else n * elem[2]
+    for elem, n in gt_index.items():
+        add(elem, n, 0)
+    for elem, n in pred_index.items():
+        add(elem, n, 1)
+        add(elem, min(n, gt_index[elem]), 2)
+    return counts
+
+def make_row(char, chars_gt, chars_pred, matches):
+    """Return (char, # ground truth, # predictions, % precision, % recall) of one label"""
     if(char == "))"):
         char = ")"
 
     prec = 0 if chars_gt == 0 else (matches/chars_gt)*100
     rec = 0 if chars_pred == 0 else (matches/chars_pred)*100
-    print("{:6s}|{:16d}|{:15d}|{:13.3f}|{:9.3f}".format(char, chars_gt, chars_pred, prec, rec))  
-
-gt = []
-lines = file_ground_truth .read().splitlines()
-for line in lines:
-    gt += line.split(" ")
-
-help1= [] #only test
-help2= [] # -_____-
-
-"""
-for i in range(len(gt)):
-    if("(w" in gt[i]):
-        help1.append(gt[i] + gt[i+1])
-    elif("(c" in gt[i]):
-        if("»" in gt[i+1] or "«" in gt[i+1] or "€" in gt[i+1]):
-            help1.append(gt[i] + gt[i+1])
-        else:
-            for char in gt[i+1]:
-                if(char != ")"):
-                    help1.append(gt[i] + char)
-
-"""
-       
-list_gt = []
-counter = 0
-
-for i in range(len(gt)):
-    if("(c" in gt[i]):
-        if("»" in gt[i+1] or "«" in gt[i+1] or "€" in gt[i+1]):
-            counter += 1
-        else:
-            for char in gt[i+1]:
-                counter += 1 if(char != ")") else 0 #for position from token
-    elif("(w" in gt[i]):
-            counter += 1
-    elif("(t" in gt[i] or "(s" in gt[i] or "(seg" in gt[i]):
-        list_gt.append((gt[i],counter,1))
-    elif("))" in gt[i]):
-        number = -1 #for # ")" ,-1 because 1 is for closed token w or c
-        for char in gt[i]:
-            number += 1 if(char == ")") else 0
-        list_gt.append((gt[i],counter,number))
-    else:
-        pass
-
-print("#Ground Truth: ", len(list_gt))
-
-pred = []
-lines = file_pred.read().splitlines()
-for line in lines:
-    split = line.split(" ")
-    help_ = 0 #for finding "(t ... "
-    for elem in split:
-        if("(t" == elem):
-            break
-        help_ += 1
-    pred += split[help_:]
-
-"""
-for i in range(len(pred)-1):
-    if("(XX" in pred[i]):
-        help2.append(pred[i] + pred[i+1])
-for i in range(len(help1)):
-    print(help1[i],"_____",help2[i])########################################################
-"""
-
-list_pred = []
-counter = 0
-
-for elem in pred:
-    if("(XX" in elem):
-        counter += 1 #for position from token
-    elif("(t" in elem or "(s" in elem or "(seg" in elem):
-        list_pred.append((elem,counter,1))
-    elif("))" in elem):
-        number = -1 #for # ")" ,-1 because 1 is for closed token w or c
-        for char in elem:
-            if(char == ")"):
-                number += 1
-        list_pred.append((elem,counter,number))
-    else:
-        pass
-"""
-print("#Prediction: ", len(list_pred))
-min_ = len(list_pred) if(len(list_pred) <= len(list_gt)) else len(list_gt)
-for i in range(min_):
-    if("(t" in list_gt[i][0] or "(t" in list_pred[i]):
-        print(list_gt[i],"_____",list_pred[i])
-"""
-print("#Wörter und Zeichen Ground Truth:", list_gt[-1][1])
-print("#Wörter und Zeichen Preciction:", list_pred[-1][1])
-
-print("File: Franz_Kafka_Auf_der_Galerie_Quelle_DigBib")
-print("Token | # Ground Truth | # predictions | % precision | % recall")
-print("---------------------------------------------------------------")
-
-for char in chars:
-    eval_char(list_gt, list_pred, char)
-   
+    return char, chars_gt, chars_pred, prec, rec
+
+def eval_char(list_gt, list_pred, char):
+    """Return (char, # ground truth, # predictions, % precision, % recall) of one label"""
+    return make_row(char, *count_labels(list_gt, list_pred)[char])
+
+def format_row(row):
+    return "{:6s}|{:16d}|{:15d}|{:13.3f}|{:9.3f}".format(*row)
+
+def iter_ground_truth(lines):
+    """Yield the (token, position, count) boundaries of the ground truth lines"""
+    counter = 0
+    after_c = False
+    for line in lines:
+        for token in line.split(" "):
+            if(after_c):
+                # the token after (c gives the position of the punctuation mark
+                if("»" in token or "«" in token or "€" in token):
+                    counter += 1
+                else:
+                    counter += len(token) - token.count(")") #for position from token
+                after_c = False
+            if("(" not in token):
+                # a word, which can only close elements
+                if("))" in token):
+                    yield (token,counter,token.count(")") - 1)
+            elif("(c" in token):
+                after_c = True
+            elif("(w" in token):
+                counter += 1
+            elif("(t" in token or "(s" in token or "(seg" in token):
+                yield (token,counter,1)
+            elif("))" in token):
+                yield (token,counter,token.count(")") - 1) #-1 because 1 is for closed token w or c
+    if(after_c):
+        raise IndexError("ground truth ends with (c")
+
+def read_ground_truth(lines):
+    """Return the (token, position, count) boundaries of the ground truth lines"""
+    return list(iter_ground_truth(lines))
+
+def _prediction_windows(lines):
+    """Yield the tokens of every window, the last window with the closing bracket of the (t"""
+    previous = None
+    for line in lines:
+        # a document may be predicted in several windows, one (t ...) per line:
+        # only keep the first "(t" and the closing bracket of the last window
+        split = line[:-1].split(" ")
+        start = split.index("(t") if "(t" in split else len(split)
+        window = split[start+1:] if previous is not None else split[start:]
+        if len(window) > 0:
+            if previous is not None:
+                yield previous
+            previous = window
+    if previous is not None:
+        previous[-1] += ")"
+        yield previous
+
+def iter_prediction(lines):
+    """Yield the (token, position, count) boundaries of the parser output lines"""
+    counter = 0
+    for window in _prediction_windows(lines):
+        for token in window:
+            if("(" not in token):
+                # a word, which can only close elements
+                if("))" in token):
+                    yield (token,counter,token.count(")") - 1)
+            # (w and (c: terminals of a prediction already corrected by prediction_to_XML
+            elif("(XX" in token or token == "(w" or token == "(c"):
+                counter += 1 #for position from token
+            elif("(t" in token or "(s" in token or "(seg" in token):
+                yield (token,counter,1)
+            elif("))" in token):
+                yield (token,counter,token.count(")") - 1) #-1 because 1 is for closed token w or c
+
+def read_prediction(lines):
+    """Return the (token, position, count) boundaries of the parser output lines"""
+    return list(iter_prediction(lines))
+
+def evaluate(list_gt, list_pred, counts=None):
+    """Return the rows of all labels in chars"""
+    if counts is None:
+        counts = count_labels(list_gt, list_pred)
+    return [make_row(char, *counts[char]) for char in chars]
+
+def write_report(list_gt, list_pred, name, out=sys.stdout, counts=None):
+    gt_tokens = list_gt[-1][1]
+    pred_tokens = list_pred[-1][1]
+    if counts is None:
+        counts = count_labels(list_gt, list_pred)
+    write_counts(len(list_gt), gt_tokens, pred_tokens, name, counts, out)
+
+def write_counts(n_gt, gt_tokens, pred_tokens, name, counts, out=sys.stdout):
+    """Write the report of count_labels counts, given the number of ground truth
+    boundaries and the positions of the last ground truth and predicted boundary"""
+    out.write("#Ground Truth:  " + str(n_gt) + "\n")
+    out.write("#Wörter und Zeichen Ground Truth: " + str(gt_tokens) + "\n")
+    out.write("#Wörter und Zeichen Preciction: " + str(pred_tokens) + "\n")
+    out.write("File: " + name + "\n")
+    out.write("Token | # Ground Truth | # predictions | % precision | % recall\n")
+    out.write("---------------------------------------------------------------\n")
+    for char in chars:
+        out.write(format_row(make_row(char, *counts[char])) + "\n")
+
+def read_files(ground_truth_path, pred_path):
+    """Return the boundaries of a ground truth and a prediction file"""
+    with open(ground_truth_path, "r") as file_ground_truth:
+        list_gt = read_ground_truth(file_ground_truth.read().splitlines())
+    with open(pred_path, "r") as file_pred:
+        list_pred = read_prediction(file_pred.read().splitlines())
+    return list_gt, list_pred
+
+def evaluate_files(ground_truth_path, pred_path, name=None, out=sys.stdout):
+    list_gt, list_pred = read_files(ground_truth_path, pred_path)
+    write_report(list_gt, list_pred, pred_path if name is None else name, out)
+
+if __name__ == "__main__":
+    args = ap.parse_args()
+    evaluate_files(args.file + "_Ground_Truth.txt", args.file + "_predict.txt", args.file)
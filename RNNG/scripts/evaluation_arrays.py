@@ -0,0 +1,92 @@
+"""evaluation.py for large documents, with NumPy
+
+The ground truth and the prediction are streamed line by line
+(evaluation.iter_ground_truth, evaluation.iter_prediction) into two integer
+arrays per side: the boundary position and the id of its token. Token strings
+are interned once, together with what the token counts for in every label of
+evaluation.chars. The (position, token) keys are matched with np.unique and
+np.intersect1d instead of Python tuple lists, and the report is the same as
+that of evaluation.py."""
+
+import argparse
+import sys
+from array import array
+
+import numpy as np
+
+import evaluation
+
+ap = argparse.ArgumentParser(description='Evaluate DATANAME_predict.txt against DATANAME_Ground_Truth.txt')
+ap.add_argument('file', help='DATANAME, i.e. the path of the document without suffix')
+
+class BoundaryTokens(object):
+    """Ids of the boundary tokens and their weight in every label of evaluation.chars"""
+
+    def __init__(self):
+        self.ids = {}
+        self.weights = []
+
+    def add(self, token, count):
+        token_id = self.ids[token] = len(self.weights)
+        weights = [0] * len(evaluation.chars)
+        for char in evaluation.boundary_labels(token):
+            # T labels count boundaries, the others the elements they open or close
+            weights[evaluation.chars.index(char)] = 1 if char[0] == "T" else count
+        self.weights.append(weights)
+        return token_id
+
+    def weight_matrix(self):
+        return np.array(self.weights, dtype=np.int64).reshape(-1, len(evaluation.chars))
+
+def read_boundaries(boundaries, tokens):
+    """Return the positions and token ids of (token, position, count) boundaries"""
+    positions = array('q')
+    ids = array('q')
+    get_id = tokens.ids.get
+    for token, position, count in boundaries:
+        token_id = get_id(token)
+        if token_id is None:
+            token_id = tokens.add(token, count)
+        positions.append(position)
+        ids.append(token_id)
+    return np.frombuffer(positions, dtype=np.int64), np.frombuffer(ids, dtype=np.int64)
+
+def _keys(positions, ids):
+    return np.unique((positions << 32) | ids, return_counts=True)
+
+def count_labels(gt, pred, tokens):
+    """Like evaluation.count_labels, for the (positions, ids) of read_boundaries"""
+    weights = tokens.weight_matrix()
+    gt_counts = np.bincount(gt[1], minlength=len(weights)) @ weights
+    pred_counts = np.bincount(pred[1], minlength=len(weights)) @ weights
+    gt_keys, n_gt = _keys(*gt)
+    pred_keys, n_pred = _keys(*pred)
+    common, gt_index, pred_index = np.intersect1d(gt_keys, pred_keys, assume_unique=True, return_indices=True)
+    # every boundary matches at most once
+    matched = np.minimum(n_gt[gt_index], n_pred[pred_index])
+    matches = matched @ weights[common & 0xffffffff]
+    return dict((char, [int(gt_counts[k]), int(pred_counts[k]), int(matches[k])])
+                for k, char in enumerate(evaluation.chars))
+
+def _lines(path):
+    with open(path, "r") as text_file:
+        for line in text_file:
+            # the line ends of str.splitlines, as in evaluation.py
+            for part in line.splitlines():
+                yield part
+
+def score_files(ground_truth_path, pred_path):
+    """Return the number of ground truth boundaries, the positions of the last
+    ground truth and predicted boundary and the counts of every label"""
+    tokens = BoundaryTokens()
+    gt = read_boundaries(evaluation.iter_ground_truth(_lines(ground_truth_path)), tokens)
+    pred = read_boundaries(evaluation.iter_prediction(_lines(pred_path)), tokens)
+    return len(gt[0]), int(gt[0][-1]), int(pred[0][-1]), count_labels(gt, pred, tokens)
+
+def evaluate_files(ground_truth_path, pred_path, name=None, out=sys.stdout):
+    n_gt, gt_tokens, pred_tokens, counts = score_files(ground_truth_path, pred_path)
+    evaluation.write_counts(n_gt, gt_tokens, pred_tokens, pred_path if name is None else name, counts, out)
+
+if __name__ == "__main__":
+    args = ap.parse_args()
+    evaluate_files(args.file + "_Ground_Truth.txt", args.file + "_predict.txt", args.file)
@@ -1,197 +1,117 @@
+import argparse
+import collections
+import io
+import itertools
+import multiprocessing
 import sys
-import get_dictionary
+from vocabulary import load_vocabulary
+from unk_signatures import unkify, get_signatures, CACHE_SIZE
+from tree_scanner import get_tags_tokens_lowercase, get_actions
 
-# tokens is a list of tokens, so no need to split it again
-def unkify(tokens, words_dict):
-    final = []
-    for token in tokens:
-        # only process the train singletons and unknown words
-        if len(token.rstrip()) == 0:
-            final.append('UNK')
-        elif not(token.rstrip() in words_dict):
-            numCaps = 0
-            hasDigit = False
-            hasDash = False
-            hasLower = False
-            for char in token.rstrip():
-                if char.isdigit():
-                    hasDigit = True
-                elif char == '-':
-                    hasDash = True
-                elif char.isalpha():
-                    if char.islower():
-                        hasLower = True
-                    elif char.isupper():
-                        numCaps += 1
-            result = 'UNK'
-            lower = token.rstrip().lower()
-            ch0 = token.rstrip()[0]
-            if ch0.isupper():
-                if numCaps == 1:
-                    result = result + '-INITC'    
-                    if lower in words_dict:
-                        result = result + '-KNOWNLC'
-                else:
-                    result = result + '-CAPS'
-            elif not(ch0.isalpha()) and numCaps > 0:
-                result = result + '-CAPS'
-            elif hasLower:
-                result = result + '-LC'
-            if hasDigit:
-                result = result + '-NUM'
-            if hasDash:
-                result = result + '-DASH' 
-            if lower[-1] == 's' and len(lower) >= 3:
-                ch2 = lower[-2]
-                if not(ch2 == 's') and not(ch2 == 'i') and not(ch2 == 'u'):
-                    result = result + '-s'
-            elif len(lower) >= 5 and not(hasDash) and not(hasDigit and numCaps > 0):
-                if lower[-2:] == 'ed':
-                    result = result + '-ed'
-                elif lower[-3:] == 'ing':
-                    result = result + '-ing'
-                elif lower[-3:] == 'ion':
-                    result = result + '-ion'
-                elif lower[-2:] == 'er':
-                    result = result + '-er'            
-                elif lower[-3:] == 'est':
-                    result = result + '-est'
-                elif lower[-2:] == 'ly':
-                    result = result + '-ly'
-                elif lower[-3:] == 'ity':
-                    result = result + '-ity'
-                elif lower[-1] == 'y':
-                    result = result + '-y'
-                elif lower[-2:] == 'al':
-                    result = result + '-al'
-            final.append(result)
-        else:
-            final.append(token.rstrip())
-    return final 
+OUTPUT_BUFFER_SIZE = 1 << 20
+CHUNK_SIZE = 64 # treebank lines per task in --jobs mode
 
-def is_next_open_bracket(line, start_idx):
-    for char in line[(start_idx + 1):]:
-        if char == '(':
-            return True
-        elif char == ')':
-            return False
-    raise IndexError('Bracket possibly not balanced, open bracket not followed by closed bracket')    
+ap = argparse.ArgumentParser(description='Print the oracle of a treebank, using a train treebank for the vocabulary mapping')
+ap.add_argument('train_file', help='train treebank or vocabulary file saved by get_dictionary.py (for vocabulary mapping purposes)')
+ap.add_argument('dev_file', help='treebank to get the oracle for')
+ap.add_argument('--jobs', type=int, default=1, help='number of worker processes')
+ap.add_argument('--min-count', type=int, help='minimum train count of a word to not be unkified')
+ap.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='treebank lines per worker task')
+ap.add_argument('--unk-cache-size', type=int, default=CACHE_SIZE, help='maximum number of cached UNK signatures (per process)')
+ap.add_argument('--unk-stats', action='store_true', help='print hit rate and size of the UNK signature cache to stderr (serial mode only)')
 
-def get_between_brackets(line, start_idx):
-    output = []
-    for char in line[(start_idx + 1):]:
-        if char == ')':
-            break
-        assert not(char == '(')
-        output.append(char)    
-    return ''.join(output)
+def get_oracle(line, words_list):
+    """Return the oracle block of one treebank line, terminated by an empty line"""
+    # first line: the bracketed tree itself itself 
+    output = ['# ' + line.rstrip()]
+    tags, tokens, lowercase = get_tags_tokens_lowercase(line)
+    assert len(tags) == len(tokens)
+    assert len(tokens) == len(lowercase)
+    output.append(' '.join(tags))
+    output.append(' '.join(tokens))
+    output.append(' '.join(lowercase))
+    unkified = unkify(tokens, words_list)    
+    output.append(' '.join(unkified))
+    output.extend(get_actions(line))
+    output.append('')
+    return '\n'.join(output) + '\n'
 
-# start_idx = open bracket
-#def skip_terminals(line, start_idx):
-#    line_end_idx = len(line) - 1
-#    for i in range(start_idx + 1, line_end_idx):
-#        if line[i] == ')':
-#            assert line[i + 1] == ' ' 
-#            return (i + 2)
-#    raise IndexError('No close bracket found in a terminal')
+def check_balanced(line, line_ctr):
+    # assert that the parenthesis are balanced
+    if line.count('(') != line.count(')'):
+        raise NotImplementedError('Unbalanced number of parenthesis in line ' + str(line_ctr)) 
 
-def get_tags_tokens_lowercase(line):
-    output = []
-    #print 'curr line', line_strip
-    line_strip = line.rstrip()
-    #print 'length of the sentence', len(line_strip)
-    for i in range(len(line_strip)):
-        if i == 0:
-            assert line_strip[i] == '('    
-        if line_strip[i] == '(' and not(is_next_open_bracket(line_strip, i)): # fulfilling this condition means this is a terminal symbol
-            output.append(get_between_brackets(line_strip, i))
-    #print 'output:',output
-    output_tags = []
-    output_tokens = []
-    output_lowercase = []
-    for terminal in output:
-        terminal_split = terminal.split()
-        assert len(terminal_split) == 2 # each terminal contains a POS tag and word        
-        output_tags.append(terminal_split[0])
-        output_tokens.append(terminal_split[1])
-        output_lowercase.append(terminal_split[1].lower())
-    return [output_tags, output_tokens, output_lowercase]    
+def write_oracle(dev_file, words_list, out):
+    """Stream the oracle of every line of dev_file to out, one write per block"""
+    line_ctr = 0
+    for line in dev_file:
+        line_ctr += 1
+        check_balanced(line, line_ctr)
+        out.write(get_oracle(line, words_list))
+
+# vocabulary of a worker process, shared once by the pool initializer
+_worker_words = None
+
+def _init_worker(words_list, cache_size):
+    global _worker_words
+    _worker_words = words_list
+    get_signatures(words_list, cache_size)
 
-def get_nonterminal(line, start_idx):
-    assert line[start_idx] == '(' # make sure it's an open bracket
+def _get_oracle_chunk(chunk):
+    line_ctr, lines = chunk
     output = []
-    for char in line[(start_idx + 1):]:
-        if char == ' ':
-            break
-        assert not(char == '(') and not(char == ')')
-        output.append(char)
+    for line in lines:
+        line_ctr += 1
+        check_balanced(line, line_ctr)
+        output.append(get_oracle(line, _worker_words))
     return ''.join(output)
 
+def read_chunks(dev_file, chunk_size):
+    """Yield (number of lines before the chunk, lines) for consecutive chunks of dev_file"""
+    line_ctr = 0
+    while True:
+        lines = list(itertools.islice(dev_file, chunk_size))
+        if not lines:
+            break
+        yield line_ctr, lines
+        line_ctr += len(lines)
 
-def get_actions(line):
-    output_actions = []
-    line_strip = line.rstrip()
-    i = 0
-    max_idx = (len(line_strip) - 1)
-    while i <= max_idx:
-        assert line_strip[i] == '(' or line_strip[i] == ')'
-        if line_strip[i] == '(':
-            if is_next_open_bracket(line_strip, i): # open non-terminal
-                curr_NT = get_nonterminal(line_strip, i)
-                output_actions.append('NT(' + curr_NT + ')')
-                i += 1  
-                while line_strip[i] != '(': # get the next open bracket, which may be a terminal or another non-terminal
-                    i += 1
-            else: # it's a terminal symbol
-                output_actions.append('SHIFT')
-                while line_strip[i] != ')':
-                    i += 1
-                i += 1
-                while line_strip[i] != ')' and line_strip[i] != '(':
-                    i += 1
-        else:
-             output_actions.append('REDUCE')
-             if i == max_idx:
-                 break
-             i += 1
-             while line_strip[i] != ')' and line_strip[i] != '(':
-                 i += 1
-    assert i == max_idx  
-    return output_actions
+def write_oracle_parallel(dev_file, words_list, out, jobs, chunk_size=CHUNK_SIZE, cache_size=CACHE_SIZE):
+    """Like write_oracle, but the chunks of dev_file are processed by jobs worker
+    processes. Results are written in input order, so the output is identical
+    to a serial run; at most 2 * jobs chunks are in flight at any time."""
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(words_list, cache_size))
+    try:
+        pending = collections.deque()
+        for chunk in read_chunks(dev_file, chunk_size):
+            pending.append(pool.apply_async(_get_oracle_chunk, (chunk,)))
+            if len(pending) >= 2 * jobs:
+                out.write(pending.popleft().get())
+        while pending:
+            out.write(pending.popleft().get())
+    finally:
+        pool.terminate()
+
+def open_output(buffer_size=OUTPUT_BUFFER_SIZE):
+    """Wrap stdout in a large write buffer, so each oracle block costs one write"""
+    raw = io.FileIO(sys.stdout.fileno(), 'w', closefd=False)
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size), encoding=sys.stdout.encoding, newline='\n')
 
 def main():
-    #if len(sys.argv) != 3:
-    #    raise NotImplementedError('Program only takes two arguments:  train file and dev file (for vocabulary mapping purposes)')
-    train_file = open(sys.argv[1], 'r')
-    #train_file = open("Franz_Kafka_Der_Heizer_Quelle_DigBib.txt","r")
-    lines = train_file.readlines()
-    train_file.close()
-    dev_file = open(sys.argv[2], 'r')
-    #dev_file = open("Franz_Kafka_Der_Heizer_Quelle_DigBib.txt","r")
-    dev_lines = dev_file.readlines()
-    dev_file.close()
-    words_list = get_dictionary.get_dict(lines) 
-    line_ctr = 0
-    # get the oracle for the train file
-    for line in dev_lines:
-        line_ctr += 1
-        # assert that the parenthesis are balanced
-        if line.count('(') != line.count(')'):
-            raise NotImplementedError('Unbalanced number of parenthesis in line ' + str(line_ctr)) 
-        # first line: the bracketed tree itself itself 
-        print ('# ' + line.rstrip())
-        tags, tokens, lowercase = get_tags_tokens_lowercase(line)
-        assert len(tags) == len(tokens)
-        assert len(tokens) == len(lowercase)
-        print(' '.join(tags))
-        print(' '.join(tokens))
-        print(' '.join(lowercase))
-        unkified = unkify(tokens, words_list)    
-        print(' '.join(unkified))
-        output_actions = get_actions(line)
-        for action in output_actions:
-            print(action)
-        print('')
+    args = ap.parse_args()
+    # both files are read lazily, line by line, so memory stays flat for any corpus size
+    words_list = load_vocabulary(args.train_file, args.min_count)
+    sys.stdout.flush()
+    signatures = get_signatures(words_list, args.unk_cache_size)
+    out = open_output()
+    with open(args.dev_file, 'r') as dev_file:
+        if args.jobs > 1:
+            write_oracle_parallel(dev_file, words_list, out, args.jobs, args.chunk_size, args.unk_cache_size)
+        else:
+            write_oracle(dev_file, words_list, out)
+    out.flush()
+    if args.unk_stats and args.jobs <= 1:
+        sys.stderr.write(signatures.format_cache_stats() + '\n')
     
 
 if __name__ == "__main__":
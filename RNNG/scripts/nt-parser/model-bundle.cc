@@ -0,0 +1,185 @@
+#include "nt-parser/model-bundle.h"
+
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <iostream>
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include "cnn/dict.h"
+#include "cnn/model.h"
+
+using namespace std;
+
+namespace parser {
+
+static const char kBundleMagic[8] = {'R', 'N', 'N', 'G', 'M', 'D', 'L', '1'};
+static const unsigned kNumHyperparameters = sizeof(Hyperparameters) / sizeof(unsigned);
+static const size_t kAlignment = 64;
+
+static size_t Aligned(size_t pos) {
+  return (pos + kAlignment - 1) / kAlignment * kAlignment;
+}
+
+namespace {
+
+struct BundleWriter {
+  explicit BundleWriter(const string& file) : out(file.c_str(), ios::binary), pos(0) {}
+  void write(const void* x, size_t n) { out.write(static_cast<const char*>(x), n); pos += n; }
+  void u32(uint32_t x) { write(&x, 4); }
+  void u64(uint64_t x) { write(&x, 8); }
+  void pad() {
+    static const char zeros[kAlignment] = {};
+    write(zeros, Aligned(pos) - pos);
+  }
+  ofstream out;
+  size_t pos;
+};
+
+} // namespace
+
+void SaveBundle(const string& file, const Hyperparameters& hp,
+                const vector<cnn::Dict*>& dicts,
+                const vector<unsigned>& pretrained_words,
+                const cnn::Model& model) {
+  BundleWriter w(file);
+  if (!w.out) { cerr << "Could not write " << file << endl; abort(); }
+  w.write(kBundleMagic, sizeof(kBundleMagic));
+  w.write(&hp, sizeof(hp));
+  w.u32(dicts.size());
+  for (auto dict : dicts) {
+    w.u32(dict->size());
+    for (unsigned i = 0; i < dict->size(); ++i) {
+      const string& word = dict->Convert(i);
+      w.u32(word.size());
+      w.write(word.data(), word.size());
+    }
+  }
+  w.u32(pretrained_words.size());
+  for (auto word : pretrained_words) w.u32(word);
+  const auto& params = model.parameters_list();
+  const auto& lookup_params = model.lookup_parameters_list();
+  w.u32(params.size());
+  for (auto p : params) w.u64(p->values.d.size());
+  w.u32(lookup_params.size());
+  for (auto p : lookup_params) {
+    w.u32(p->values.size());
+    w.u64(p->dim.size());
+  }
+  w.pad();
+  for (auto p : params) {
+    w.write(p->values.v, sizeof(float) * p->values.d.size());
+    w.pad();
+  }
+  for (auto p : lookup_params) {
+    for (auto& row : p->values)
+      w.write(row.v, sizeof(float) * p->dim.size());
+    w.pad();
+  }
+  if (!w.out) { cerr << "Could not write " << file << endl; abort(); }
+  cerr << "Wrote model bundle " << file << " (" << w.pos << " bytes)\n";
+}
+
+ModelBundle::ModelBundle(const string& file) : file(file) {
+  int fd = open(file.c_str(), O_RDONLY);
+  if (fd < 0) { cerr << "Could not open " << file << endl; abort(); }
+  struct stat st;
+  fstat(fd, &st);
+  size = st.st_size;
+  void* mapped = mmap(nullptr, size, PROT_READ, MAP_SHARED, fd, 0);
+  close(fd);
+  if (mapped == MAP_FAILED) { cerr << "Could not mmap " << file << endl; abort(); }
+  data = static_cast<const char*>(mapped);
+  size_t pos = 0;
+  auto need = [&](size_t n) {
+    if (pos + n > size) { cerr << "Truncated model bundle " << file << endl; abort(); }
+  };
+  auto read_u32 = [&]() { need(4); uint32_t x; memcpy(&x, data + pos, 4); pos += 4; return x; };
+  auto read_u64 = [&]() { need(8); uint64_t x; memcpy(&x, data + pos, 8); pos += 8; return x; };
+  need(sizeof(kBundleMagic));
+  if (memcmp(data, kBundleMagic, sizeof(kBundleMagic)) != 0) {
+    cerr << file << " is not a model bundle\n";
+    abort();
+  }
+  pos += sizeof(kBundleMagic);
+  unsigned* hp_fields = reinterpret_cast<unsigned*>(&hp);
+  for (unsigned i = 0; i < kNumHyperparameters; ++i) hp_fields[i] = read_u32();
+  words.resize(read_u32());
+  for (auto& dict_words : words) {
+    dict_words.resize(read_u32());
+    for (auto& word : dict_words) {
+      uint32_t len = read_u32();
+      need(len);
+      word.assign(data + pos, len);
+      pos += len;
+    }
+  }
+  pretrained_words.resize(read_u32());
+  for (auto& word : pretrained_words) word = read_u32();
+  param_sizes.resize(read_u32());
+  for (auto& n : param_sizes) n = read_u64();
+  lookup_rows.resize(read_u32());
+  lookup_row_sizes.resize(lookup_rows.size());
+  for (unsigned i = 0; i < lookup_rows.size(); ++i) {
+    lookup_rows[i] = read_u32();
+    lookup_row_sizes[i] = read_u64();
+  }
+  values_start = Aligned(pos);
+  size_t end = values_start;
+  for (auto n : param_sizes) end = Aligned(end + sizeof(float) * n);
+  for (unsigned i = 0; i < lookup_rows.size(); ++i)
+    end = Aligned(end + sizeof(float) * lookup_rows[i] * lookup_row_sizes[i]);
+  if (end > Aligned(size)) { cerr << "Truncated model bundle " << file << endl; abort(); }
+}
+
+ModelBundle::~ModelBundle() {
+  munmap(const_cast<char*>(data), size);
+}
+
+void ModelBundle::LoadDicts(const vector<cnn::Dict*>& dicts) const {
+  if (dicts.size() != words.size()) { cerr << "Wrong number of dictionaries in " << file << endl; abort(); }
+  for (unsigned k = 0; k < dicts.size(); ++k) {
+    for (unsigned i = 0; i < words[k].size(); ++i) {
+      if (dicts[k]->Convert(words[k][i]) != (int)i) {
+        cerr << "Duplicate dictionary entry in " << file << ": " << words[k][i] << endl;
+        abort();
+      }
+    }
+  }
+}
+
+void ModelBundle::MapParameters(cnn::Model* model) const {
+  const auto& params = model->parameters_list();
+  const auto& lookup_params = model->lookup_parameters_list();
+  if (params.size() != param_sizes.size() || lookup_params.size() != lookup_rows.size()) {
+    cerr << "The parameters of " << file << " do not match the model\n";
+    abort();
+  }
+  // prediction only reads the parameters, so they can point into the read-only mapping
+  size_t pos = values_start;
+  for (unsigned i = 0; i < params.size(); ++i) {
+    if (params[i]->values.d.size() != param_sizes[i]) {
+      cerr << "The parameters of " << file << " do not match the model\n";
+      abort();
+    }
+    params[i]->values.v = const_cast<float*>(reinterpret_cast<const float*>(data + pos));
+    pos = Aligned(pos + sizeof(float) * param_sizes[i]);
+  }
+  for (unsigned i = 0; i < lookup_params.size(); ++i) {
+    auto& values = lookup_params[i]->values;
+    if (values.size() != lookup_rows[i] || lookup_params[i]->dim.size() != lookup_row_sizes[i]) {
+      cerr << "The parameters of " << file << " do not match the model\n";
+      abort();
+    }
+    for (unsigned j = 0; j < values.size(); ++j)
+      values[j].v = const_cast<float*>(reinterpret_cast<const float*>(data + pos) + j * lookup_row_sizes[i]);
+    pos = Aligned(pos + sizeof(float) * lookup_rows[i] * lookup_row_sizes[i]);
+  }
+}
+
+} // namespace parser
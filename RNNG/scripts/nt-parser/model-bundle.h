@@ -0,0 +1,61 @@
+#ifndef PARSER_MODEL_BUNDLE_H_
+#define PARSER_MODEL_BUNDLE_H_
+
+#include <string>
+#include <vector>
+
+namespace cnn { class Dict; class Model; }
+
+namespace parser {
+
+// the settings that determine the shape of a parser's parameters
+struct Hyperparameters {
+  unsigned implicit_reduce_after_shift;
+  unsigned use_pos;
+  unsigned layers;
+  unsigned input_dim;
+  unsigned hidden_dim;
+  unsigned action_dim;
+  unsigned pretrained_dim;
+  unsigned lstm_input_dim;
+  unsigned pos_dim;
+};
+
+// A model bundle holds everything needed for prediction: the hyperparameters,
+// the frozen dictionaries (in id order), the ids of the words with pretrained
+// embeddings and the parameter values as 64-byte aligned float32 blocks.
+void SaveBundle(const std::string& file, const Hyperparameters& hp,
+                const std::vector<cnn::Dict*>& dicts,
+                const std::vector<unsigned>& pretrained_words,
+                const cnn::Model& model);
+
+// memory-maps a bundle written by SaveBundle; the parameters are used in
+// place, so all processes that load the same bundle share its pages
+class ModelBundle {
+ public:
+  explicit ModelBundle(const std::string& file);
+  ~ModelBundle();
+  // adds the words of the bundle to the (empty) dictionaries, in the order of SaveBundle
+  void LoadDicts(const std::vector<cnn::Dict*>& dicts) const;
+  // points the values of all parameters of model (which must have been built with
+  // the hyperparameters and dictionary sizes of the bundle, with external values,
+  // see cnn::Model::set_external_values) into the mapping
+  void MapParameters(cnn::Model* model) const;
+
+  Hyperparameters hp;
+  std::vector<unsigned> pretrained_words;
+
+ private:
+  std::string file;
+  const char* data;
+  size_t size;
+  std::vector<std::vector<std::string>> words;
+  std::vector<unsigned long long> param_sizes;    // floats per parameter
+  std::vector<unsigned> lookup_rows;
+  std::vector<unsigned long long> lookup_row_sizes;  // floats per row of a lookup parameter
+  size_t values_start;
+};
+
+} // namespace parser
+
+#endif
@@ -1,5 +1,9 @@
+#include <algorithm>
+#include <cerrno>
 #include <cstdlib>
+#include <cstring>
 #include <iostream>
+#include <sstream>
 #include <vector>
 #include <fstream>
 #include <cmath>
@@ -7,10 +11,13 @@
 #include <ctime>
 #include <unordered_set>
 #include <unordered_map>
+#include <memory>
 
 #include <execinfo.h>
 #include <unistd.h>
 #include <signal.h>
+#include <sys/socket.h>
+#include <sys/un.h>
 
 #include <boost/archive/text_oarchive.hpp>
 #include <boost/archive/text_iarchive.hpp>
@@ -26,6 +33,7 @@
 #include "cnn/cfsm-builder.h"
 
 #include "nt-parser/oracle.h"
+#include "nt-parser/model-bundle.h"
 #include "nt-parser/pretrained.h"
 #include "nt-parser/compressed-fstream.h"
 #include "nt-parser/eval.h"
@@ -72,10 +80,14 @@ void InitCommandLine(int argc, char** argv, po::variables_map* conf) {
         ("bracketing_dev_data,C", po::value<string>(), "Development bracketed corpus")
 
         ("test_data,p", po::value<string>(), "Test corpus")
+        ("predict_only", "With -p: only print the predicted trees, without scoring the gold actions and running EVALB")
+        ("server", po::value<string>()->implicit_value("-"), "Keep the model loaded and parse oracle sentences sent to stdin (or to the Unix socket at the given path); a batch ends with a \"### END\" line")
         ("dropout,D", po::value<float>(), "Dropout rate")
         ("samples,s", po::value<unsigned>(), "Sample N trees for each test sentence instead of greedy max decoding")
         ("alpha,a", po::value<float>(), "Flatten (0 < alpha < 1) or sharpen (1 < alpha) sampling distribution")
         ("model,m", po::value<string>(), "Load saved model from this file")
+        ("bundle", po::value<string>(), "Load dictionaries, hyperparameters and parameters from a model bundle (instead of -T and -m)")
+        ("save_bundle", po::value<string>(), "Write the dictionaries, hyperparameters and parameters of -T and -m to a model bundle and exit")
         ("use_pos_tags,P", "make POS tags visible to parser")
         ("layers", po::value<unsigned>()->default_value(2), "number of LSTM layers")
         ("action_dim", po::value<unsigned>()->default_value(16), "action embedding size")
@@ -95,8 +107,12 @@ void InitCommandLine(int argc, char** argv, po::variables_map* conf) {
     cerr << dcmdline_options << endl;
     exit(1);
   }
-  if (conf->count("training_data") == 0) {
-    cerr << "Please specify --traing_data (-T): this is required to determine the vocabulary mapping, even if the parser is used in prediction mode.\n";
+  if (conf->count("training_data") == 0 && conf->count("bundle") == 0) {
+    cerr << "Please specify --traing_data (-T) or --bundle: this is required to determine the vocabulary mapping, even if the parser is used in prediction mode.\n";
+    exit(1);
+  }
+  if (conf->count("bundle") && conf->count("train")) {
+    cerr << "A model bundle can only be used for prediction\n";
     exit(1);
   }
 }
@@ -169,7 +185,8 @@ struct ParserBuilder {
     if (pretrained.size() > 0) {
       p_t = model->add_lookup_parameters(VOCAB_SIZE, {PRETRAINED_DIM});
       for (auto it : pretrained)
-        p_t->Initialize(it.first, it.second);
+        if (!it.second.empty()) // empty: the values are mapped from a model bundle
+          p_t->Initialize(it.first, it.second);
       p_t2l = model->add_parameters({LSTM_INPUT_DIM, PRETRAINED_DIM});
     } else {
       p_t = nullptr;
@@ -850,6 +867,155 @@ vector<unsigned> log_prob_parser_beam(ComputationGraph* hg,
   }
 };
 
+// writes the tree of a predicted action sequence, as in the "sii ||| score ||| tree" lines
+void PrintTree(ostream& out, const vector<unsigned>& pred, const parser::Sentence& sentence, bool sample) {
+  int ti = 0;
+  for (auto a : pred) {
+    if (adict.Convert(a)[0] == 'N') {
+      out << " (" << ntermdict.Convert(action2NTindex.find(a)->second);
+    } else if (adict.Convert(a)[0] == 'S') {
+      if (IMPLICIT_REDUCE_AFTER_SHIFT) {
+        out << termdict.Convert(sentence.raw[ti++]) << ")";
+      } else {
+        if (!sample) {
+          string preterminal = "XX";
+          out << " (" << preterminal << ' ' << termdict.Convert(sentence.raw[ti++]) << ")";
+        } else { // use this branch to surpress preterminals
+          out << ' ' << termdict.Convert(sentence.raw[ti++]);
+        }
+      }
+    } else out << ')';
+  }
+}
+
+const string kEndOfBatch = "### END";
+const string kError = "### ERROR";
+
+// reads oracle sentences (blocks ending with an empty line) from in and writes their
+// "sii ||| score ||| tree" lines to out as soon as they are parsed. A "### END" line
+// completes a batch: it is echoed after the last tree and sii starts from 0 again.
+// A sentence that cannot be read or parsed (e.g. a word missing from the frozen
+// dictionaries) gets a "### ERROR sii message" line instead and serving goes on.
+void Serve(ParserBuilder& parser, parser::TopDownOracle& oracle, istream& in, ostream& out, bool sample) {
+  unsigned sii = 0;
+  double right = 0;
+  const vector<int> actions;
+  string line, block;
+  while (true) {
+    bool more = static_cast<bool>(getline(in, line));
+    if (more && line != kEndOfBatch && line.size() > 0) {
+      block += line;
+      block += '\n';
+      continue;
+    }
+    if (block.size() > 0) {
+      istringstream block_in(block);
+      parser::Sentence sentence;
+      vector<int> gold_actions;
+      int lc = 0;
+      try {
+        if (oracle.read_sentence(block_in, false, &sentence, &gold_actions, &lc)) {
+          ostringstream trees;
+          for (unsigned z = 0; z < N_SAMPLES; ++z) {
+            ComputationGraph hg;
+            vector<unsigned> pred = parser.log_prob_parser(&hg,sentence,actions,&right,sample,true);
+            double lp = as_scalar(hg.incremental_forward());
+            trees << sii << " ||| " << -lp << " |||";
+            PrintTree(trees, pred, sentence, sample);
+            trees << '\n';
+          }
+          out << trees.str();
+          ++sii;
+        }
+      } catch (const std::exception& e) {
+        string message = e.what();
+        replace(message.begin(), message.end(), '\n', ' ');
+        out << kError << ' ' << sii << ' ' << message << '\n';
+        ++sii;
+      }
+      block.clear();
+    }
+    if (!more) break;
+    if (line == kEndOfBatch) {
+      out << kEndOfBatch << endl;
+      sii = 0;
+    }
+  }
+  out.flush();
+}
+
+// a stream buffer over a socket, with plain read and write calls
+class SocketBuf : public streambuf {
+ public:
+  explicit SocketBuf(int fd) : fd(fd) {
+    setg(in, in, in);
+    setp(out, out + sizeof(out));
+  }
+  ~SocketBuf() { sync(); }
+
+ protected:
+  int underflow() override {
+    ssize_t n;
+    do { n = read(fd, in, sizeof(in)); } while (n < 0 && errno == EINTR);
+    if (n <= 0) return traits_type::eof();
+    setg(in, in, in + n);
+    return traits_type::to_int_type(*gptr());
+  }
+  int overflow(int c) override {
+    if (sync() != 0) return traits_type::eof();
+    if (!traits_type::eq_int_type(c, traits_type::eof())) {
+      *pptr() = traits_type::to_char_type(c);
+      pbump(1);
+    }
+    return traits_type::not_eof(c);
+  }
+  int sync() override {
+    const char* p = pbase();
+    while (p < pptr()) {
+      ssize_t n = write(fd, p, pptr() - p);
+      if (n < 0 && errno == EINTR) continue;
+      if (n <= 0) break;  // the client went away
+      p += n;
+    }
+    bool written = p == pptr();
+    setp(out, out + sizeof(out));
+    return written ? 0 : -1;
+  }
+
+ private:
+  int fd;
+  char in[1 << 16];
+  char out[1 << 16];
+};
+
+// serves the clients of a Unix socket one after another, each connection may send several batches
+void ServeSocket(ParserBuilder& parser, parser::TopDownOracle& oracle, const string& path, bool sample) {
+  int fd = socket(AF_UNIX, SOCK_STREAM, 0);
+  sockaddr_un addr;
+  memset(&addr, 0, sizeof(addr));
+  addr.sun_family = AF_UNIX;
+  if (fd < 0 || path.size() >= sizeof(addr.sun_path)) { cerr << "Could not create socket " << path << endl; abort(); }
+  strncpy(addr.sun_path, path.c_str(), sizeof(addr.sun_path) - 1);
+  unlink(path.c_str());
+  if (bind(fd, (sockaddr*)&addr, sizeof(addr)) != 0 || listen(fd, 8) != 0) {
+    cerr << "Could not listen on socket " << path << endl;
+    abort();
+  }
+  signal(SIGPIPE, SIG_IGN); // a client that goes away must not stop the server
+  cerr << "Listening on " << path << endl;
+  while (true) {
+    int client = accept(fd, nullptr, nullptr);
+    if (client < 0) continue;
+    {
+      SocketBuf buf(client);
+      istream in(&buf);
+      ostream out(&buf);
+      Serve(parser, oracle, in, out, sample);
+    }
+    close(client);
+  }
+}
+
 void signal_callback_handler(int /* signum */) {
   if (requested_stop) {
     cerr << "\nReceived SIGINT again, quitting.\n";
@@ -912,10 +1078,31 @@ int main(int argc, char** argv) {
   parser::TopDownOracle corpus(&termdict, &adict, &posdict, &ntermdict);
   parser::TopDownOracle dev_corpus(&termdict, &adict, &posdict, &ntermdict);
   parser::TopDownOracle test_corpus(&termdict, &adict, &posdict, &ntermdict);
-  corpus.load_oracle(conf["training_data"].as<string>(), true);	
-  corpus.load_bdata(conf["bracketing_dev_data"].as<string>());
+  const vector<cnn::Dict*> dicts = {&termdict, &adict, &posdict, &ntermdict};
+  unique_ptr<parser::ModelBundle> bundle;
+  if (conf.count("bundle")) {
+    bundle.reset(new parser::ModelBundle(conf["bundle"].as<string>()));
+    const parser::Hyperparameters& hp = bundle->hp;
+    IMPLICIT_REDUCE_AFTER_SHIFT = hp.implicit_reduce_after_shift;
+    USE_POS = hp.use_pos;
+    LAYERS = hp.layers;
+    INPUT_DIM = hp.input_dim;
+    HIDDEN_DIM = hp.hidden_dim;
+    ACTION_DIM = hp.action_dim;
+    PRETRAINED_DIM = hp.pretrained_dim;
+    LSTM_INPUT_DIM = hp.lstm_input_dim;
+    POS_DIM = hp.pos_dim;
+    bundle->LoadDicts(dicts);
+    // the embeddings themselves are parameters of the bundle
+    for (auto word : bundle->pretrained_words)
+      pretrained[word] = vector<float>();
+  } else {
+    corpus.load_oracle(conf["training_data"].as<string>(), true);
+  }
+  if (conf.count("bracketing_dev_data"))
+    corpus.load_bdata(conf["bracketing_dev_data"].as<string>());
 
-  if (conf.count("words"))
+  if (conf.count("words") && !bundle)
     parser::ReadEmbeddings_word2vec(conf["words"].as<string>(), &termdict, &pretrained);
 
   // freeze dictionaries so we don't accidentaly load OOVs
@@ -962,12 +1149,36 @@ int main(int argc, char** argv) {
   for (unsigned i = 0; i < adict.size(); ++i)
     possible_actions[i] = i;
 
+  // the parameters of a bundle get no memory of their own, their values are the mapped pages
+  model.set_external_values(bool(bundle));
   ParserBuilder parser(&model, pretrained);
-  if (conf.count("model")) {
+  if (bundle) {
+    bundle->MapParameters(&model);
+  } else if (conf.count("model")) {
     ifstream in(conf["model"].as<string>().c_str());
     boost::archive::text_iarchive ia(in);
     ia >> model;
   }
+  if (conf.count("save_bundle")) {
+    const parser::Hyperparameters hp = {IMPLICIT_REDUCE_AFTER_SHIFT, USE_POS, LAYERS, INPUT_DIM, HIDDEN_DIM,
+                                        ACTION_DIM, PRETRAINED_DIM, LSTM_INPUT_DIM, POS_DIM};
+    vector<unsigned> pretrained_words;
+    for (auto& it : pretrained) pretrained_words.push_back(it.first);
+    parser::SaveBundle(conf["save_bundle"].as<string>(), hp, dicts, pretrained_words, model);
+    return 0;
+  }
+
+  if (conf.count("server")) {
+    const string where = conf["server"].as<string>();
+    parser::TopDownOracle requests(&termdict, &adict, &posdict, &ntermdict);
+    if (where == "-") {
+      cerr << "Reading oracle sentences from stdin\n";
+      Serve(parser, requests, cin, cout, conf.count("samples") > 0);
+    } else {
+      ServeSocket(parser, requests, where, conf.count("samples") > 0);
+    }
+    return 0;
+  }
 
   //TRAINING
   if (conf.count("train")) {
@@ -1148,26 +1359,14 @@ int main(int argc, char** argv) {
              vector<unsigned> pred = parser.log_prob_parser(&hg,sentence,actions,&right,sample,true);
              double lp = as_scalar(hg.incremental_forward());
              cout << sii << " ||| " << -lp << " |||";
-             int ti = 0;
-             for (auto a : pred) {
-               if (adict.Convert(a)[0] == 'N') {
-                 cout << " (" << ntermdict.Convert(action2NTindex.find(a)->second);
-               } else if (adict.Convert(a)[0] == 'S') {
-                 if (IMPLICIT_REDUCE_AFTER_SHIFT) {
-                   cout << termdict.Convert(sentence.raw[ti++]) << ")";
-                 } else {
-                   if (!sample) {
-                     string preterminal = "XX";
-                     cout << " (" << preterminal << ' ' << termdict.Convert(sentence.raw[ti++]) << ")";
-                   } else { // use this branch to surpress preterminals
-                     cout << ' ' << termdict.Convert(sentence.raw[ti++]);
-                   }
-                 }
-               } else cout << ')';
-             }
+             PrintTree(cout, pred, sentence, sample);
              cout << endl;
            }
        }
+       if (conf.count("predict_only")) {
+         cout.flush();
+         return 0;
+       }
        ostringstream os;
         os << "/tmp/parser_test_eval." << getpid() << ".txt";
         const string pfx = os.str();
@@ -1,7 +1,15 @@
 #include "nt-parser/oracle.h"
 
 #include <cassert>
+#include <cstdint>
+#include <cstring>
 #include <fstream>
+#include <stdexcept>
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 
 #include "cnn/dict.h"
 #include "nt-parser/compressed-fstream.h"
@@ -33,80 +41,214 @@ void Oracle::ReadSentenceView(const std::string& line, cnn::Dict* dict, vector<i
       sent->push_back(x);
     }
   }
-  assert(sent->size() > 0); // empty sentences not allowed
+  if (sent->size() == 0) throw runtime_error("Empty sentence in oracle"); // empty sentences not allowed
 }
 
 void TopDownOracle::load_bdata(const string& file) {
    devdata=file;
 }
 
-void TopDownOracle::load_oracle(const string& file, bool is_training) {
-  cerr << "Loading top-down oracle from " << file << " [" << (is_training ? "training" : "non-training") << "] ...\n";
-  cnn::compressed_ifstream in(file.c_str());
-  assert(in);
-  const string kREDUCE = "REDUCE";
-  const string kSHIFT = "SHIFT";
-  const int kREDUCE_INT = ad->Convert("REDUCE");
-  const int kSHIFT_INT = ad->Convert("SHIFT");
-  int lc = 0;
-  string line;
-  vector<int> cur_acts;
-  while(getline(in, line)) {
-    ++lc;
-    //cerr << "line number = " << lc << endl;
-    cur_acts.clear();
-    if (line.size() == 0 || line[0] == '#') continue;
-    sents.resize(sents.size() + 1);
-    auto& cur_sent = sents.back();
-    if (is_training) {  // at training time, we load both "UNKified" versions of the data, and raw versions
-      ReadSentenceView(line, pd, &cur_sent.pos);
-      getline(in, line);
-      ReadSentenceView(line, d, &cur_sent.raw);
-      getline(in, line);
-      ReadSentenceView(line, d, &cur_sent.lc);
-      getline(in, line);
-      ReadSentenceView(line, d, &cur_sent.unk);
-    } else { // at test time, we ignore the raw strings and just use the "UNKified" versions
-      ReadSentenceView(line, pd, &cur_sent.pos);
-      getline(in, line);
-      getline(in, line);
-      ReadSentenceView(line, d, &cur_sent.lc);
-      getline(in, line);
-      ReadSentenceView(line, d, &cur_sent.unk);
-      cur_sent.raw = cur_sent.unk;
+static const char kBinaryOracleMagic[8] = {'R', 'N', 'N', 'G', 'B', 'O', 'R', '1'};
+
+bool TopDownOracle::IsBinaryOracle(const string& file) {
+  ifstream in(file.c_str(), ios::binary);
+  char magic[sizeof(kBinaryOracleMagic)];
+  return in.read(magic, sizeof(magic)) && memcmp(magic, kBinaryOracleMagic, sizeof(magic)) == 0;
+}
+
+namespace {
+
+// maps the ids of a binary oracle's dictionary to the ids of a cnn::Dict,
+// converting each entry on first use (i.e. in the same order as the text oracle)
+struct BinaryDictMap {
+  BinaryDictMap(cnn::Dict* dict, const vector<string>& words) : d(dict), w(words), ids(words.size(), -1) {}
+  int operator()(int32_t x) {
+    if (x < 0 || (unsigned)x >= ids.size()) { cerr << "Corrupt binary oracle: id out of range\n"; abort(); }
+    if (ids[x] < 0) ids[x] = d->Convert(w[x]);
+    return ids[x];
+  }
+  cnn::Dict* d;
+  const vector<string>& w;
+  vector<int> ids;
+};
+
+} // namespace
+
+void TopDownOracle::load_binary_oracle(const string& file, bool is_training) {
+  cerr << "Loading binary top-down oracle from " << file << " [" << (is_training ? "training" : "non-training") << "] ...\n";
+  int fd = open(file.c_str(), O_RDONLY);
+  if (fd < 0) { cerr << "Could not open " << file << endl; abort(); }
+  struct stat st;
+  fstat(fd, &st);
+  const size_t size = st.st_size;
+  void* mapped = mmap(nullptr, size, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);
+  if (mapped == MAP_FAILED) { cerr << "Could not mmap " << file << endl; abort(); }
+  const char* data = static_cast<const char*>(mapped);
+  size_t pos = sizeof(kBinaryOracleMagic);
+  auto need = [&](size_t n) {
+    if (pos + n > size) { cerr << "Truncated binary oracle " << file << endl; abort(); }
+  };
+  auto read_u32 = [&]() { need(4); uint32_t x; memcpy(&x, data + pos, 4); pos += 4; return x; };
+  auto read_u64 = [&]() { need(8); uint64_t x; memcpy(&x, data + pos, 8); pos += 8; return x; };
+  const uint32_t n_sents = read_u32();
+  const uint32_t sizes[3] = {read_u32(), read_u32(), read_u32()};  // terminals, POS tags, actions
+  const uint64_t n_tokens = read_u64();
+  const uint64_t n_actions = read_u64();
+  vector<string> words[3];
+  for (unsigned k = 0; k < 3; ++k) {
+    words[k].resize(sizes[k]);
+    for (unsigned i = 0; i < sizes[k]; ++i) {
+      uint32_t len = read_u32();
+      need(len);
+      words[k][i].assign(data + pos, len);
+      pos += len;
     }
-    lc += 3;
-    if (!cur_sent.SizesMatch()) {
-      cerr << "Mismatched lengths of input strings in oracle before line " << lc << endl;
+  }
+  pos += (8 - pos % 8) % 8;
+  need(8 * 2 * (n_sents + 1) + 4 * (4 * n_tokens + n_actions));
+  // the file is written little-endian with 8-byte aligned arrays, so they can be used in place
+  const uint64_t* tok_offsets = reinterpret_cast<const uint64_t*>(data + pos);
+  const uint64_t* act_offsets = tok_offsets + n_sents + 1;
+  const int32_t* pos_ids = reinterpret_cast<const int32_t*>(act_offsets + n_sents + 1);
+  const int32_t* raw_ids = pos_ids + n_tokens;
+  const int32_t* lc_ids = raw_ids + n_tokens;
+  const int32_t* unk_ids = lc_ids + n_tokens;
+  const int32_t* act_ids = unk_ids + n_tokens;
+
+  BinaryDictMap term_map(d, words[0]), pos_map(pd, words[1]), act_map(ad, words[2]);
+  ad->Convert("REDUCE");
+  const int kSHIFT_INT = ad->Convert("SHIFT");
+  for (auto& action : words[2]) {
+    if (action != "SHIFT" && action != "REDUCE" && action.find("NT(") != 0) {
+      cerr << "Malformed action in binary oracle: " << action << endl;
       abort();
     }
-    int termc = 0;
-    while(getline(in, line)) {
-      ++lc;
-      //cerr << "line number = " << lc << endl;
-      if (line.size() == 0) break;
-      assert(line.find(' ') == string::npos);
-      if (line == kREDUCE) {
-        cur_acts.push_back(kREDUCE_INT);
-      } else if (line.find("NT(") == 0) {
+  }
+  vector<bool> nt_converted(words[2].size(), false);
+  sents.reserve(sents.size() + n_sents);
+  actions.reserve(actions.size() + n_sents);
+  for (unsigned si = 0; si < n_sents; ++si) {
+    sents.resize(sents.size() + 1);
+    auto& cur_sent = sents.back();
+    const uint64_t start = tok_offsets[si], end = tok_offsets[si + 1];
+    for (uint64_t i = start; i < end; ++i) cur_sent.pos.push_back(pos_map(pos_ids[i]));
+    if (is_training)
+      for (uint64_t i = start; i < end; ++i) cur_sent.raw.push_back(term_map(raw_ids[i]));
+    for (uint64_t i = start; i < end; ++i) cur_sent.lc.push_back(term_map(lc_ids[i]));
+    for (uint64_t i = start; i < end; ++i) cur_sent.unk.push_back(term_map(unk_ids[i]));
+    if (!is_training) cur_sent.raw = cur_sent.unk;
+    vector<int> cur_acts;
+    cur_acts.reserve(act_offsets[si + 1] - act_offsets[si]);
+    unsigned termc = 0;
+    for (uint64_t i = act_offsets[si]; i < act_offsets[si + 1]; ++i) {
+      const int a = act_map(act_ids[i]);  // also checks the range of the id
+      const string& action = words[2][act_ids[i]];
+      if (action[0] == 'N' && !nt_converted[act_ids[i]]) {
         // Convert NT
-        nd->Convert(line.substr(3, line.size() - 4));
-        // NT(X) is put into the actions list as NT(X)
-        cur_acts.push_back(ad->Convert(line));
-      } else if (line == kSHIFT) {
-        cur_acts.push_back(kSHIFT_INT);
-        termc++;
-      } else {
-        cerr << "Malformed input in line " << lc << endl;
-        abort();
+        nd->Convert(action.substr(3, action.size() - 4));
+        nt_converted[act_ids[i]] = true;
       }
+      if (a == kSHIFT_INT) termc++;
+      cur_acts.push_back(a);
     }
     actions.push_back(cur_acts);
-    if (termc != sents.back().size()) {
-      cerr << "Mismatched number of tokens and SHIFTs in oracle before line " << lc << endl;
+    if (termc != cur_sent.size() || !cur_sent.SizesMatch()) {
+      cerr << "Mismatched number of tokens and SHIFTs in binary oracle sentence " << si << endl;
       abort();
     }
   }
+  munmap(mapped, size);
+  cerr << "Loaded " << sents.size() << " sentences\n";
+  cerr << "    cumulative      action vocab size: " << ad->size() << endl;
+  cerr << "    cumulative    terminal vocab size: " << d->size() << endl;
+  cerr << "    cumulative nonterminal vocab size: " << nd->size() << endl;
+  cerr << "    cumulative         pos vocab size: " << pd->size() << endl;
+}
+
+bool TopDownOracle::read_sentence(istream& in, bool is_training, Sentence* sent, vector<int>* acts, int* lc) {
+  const string kREDUCE = "REDUCE";
+  const string kSHIFT = "SHIFT";
+  const int kREDUCE_INT = ad->Convert("REDUCE");
+  const int kSHIFT_INT = ad->Convert("SHIFT");
+  string line;
+  while(getline(in, line)) {
+    ++*lc;
+    if (line.size() != 0 && line[0] != '#') break;
+  }
+  if (!in) return false;
+  // the four token lines of a sentence must all be there
+  auto next_line = [&]() {
+    if (!getline(in, line) || line.size() == 0)
+      throw runtime_error("Truncated sentence in oracle in line " + to_string(*lc + 1));
+    ++*lc;
+  };
+  auto& cur_sent = *sent;
+  if (is_training) {  // at training time, we load both "UNKified" versions of the data, and raw versions
+    ReadSentenceView(line, pd, &cur_sent.pos);
+    next_line();
+    ReadSentenceView(line, d, &cur_sent.raw);
+    next_line();
+    ReadSentenceView(line, d, &cur_sent.lc);
+    next_line();
+    ReadSentenceView(line, d, &cur_sent.unk);
+  } else { // at test time, we ignore the raw strings and just use the "UNKified" versions
+    ReadSentenceView(line, pd, &cur_sent.pos);
+    next_line();
+    next_line();
+    ReadSentenceView(line, d, &cur_sent.lc);
+    next_line();
+    ReadSentenceView(line, d, &cur_sent.unk);
+    cur_sent.raw = cur_sent.unk;
+  }
+  if (!cur_sent.SizesMatch())
+    throw runtime_error("Mismatched lengths of input strings in oracle before line " + to_string(*lc));
+  unsigned termc = 0;
+  while(getline(in, line)) {
+    ++*lc;
+    //cerr << "line number = " << lc << endl;
+    if (line.size() == 0) break;
+    if (line.find(' ') != string::npos)
+      throw runtime_error("Malformed input in line " + to_string(*lc));
+    if (line == kREDUCE) {
+      acts->push_back(kREDUCE_INT);
+    } else if (line.find("NT(") == 0) {
+      // Convert NT
+      nd->Convert(line.substr(3, line.size() - 4));
+      // NT(X) is put into the actions list as NT(X)
+      acts->push_back(ad->Convert(line));
+    } else if (line == kSHIFT) {
+      acts->push_back(kSHIFT_INT);
+      termc++;
+    } else {
+      throw runtime_error("Malformed input in line " + to_string(*lc));
+    }
+  }
+  if (termc != cur_sent.size())
+    throw runtime_error("Mismatched number of tokens and SHIFTs in oracle before line " + to_string(*lc));
+  return true;
+}
+
+void TopDownOracle::load_oracle(const string& file, bool is_training) {
+  if (IsBinaryOracle(file)) {
+    load_binary_oracle(file, is_training);
+    return;
+  }
+  cerr << "Loading top-down oracle from " << file << " [" << (is_training ? "training" : "non-training") << "] ...\n";
+  cnn::compressed_ifstream in(file.c_str());
+  assert(in);
+  ad->Convert("REDUCE");
+  ad->Convert("SHIFT");
+  int lc = 0;
+  while (true) {
+    sents.resize(sents.size() + 1);
+    actions.resize(actions.size() + 1);
+    if (!read_sentence(in, is_training, &sents.back(), &actions.back(), &lc)) {
+      sents.pop_back();
+      actions.pop_back();
+      break;
+    }
+  }
   cerr << "Loaded " << sents.size() << " sentences\n";
   cerr << "    cumulative      action vocab size: " << ad->size() << endl;
   cerr << "    cumulative    terminal vocab size: " << d->size() << endl;
@@ -46,6 +46,14 @@ class TopDownOracle : public Oracle {
   // tokens will be available
   void load_bdata(const std::string& file);
   void load_oracle(const std::string& file, bool is_training);
+  // reads the next sentence of an oracle stream into sent and acts (without
+  // adding it to sents); returns false at the end of the stream and throws
+  // std::runtime_error for a malformed sentence. lc counts lines
+  bool read_sentence(std::istream& in, bool is_training, Sentence* sent, std::vector<int>* acts, int* lc);
+  // loads an oracle written by oracle_binary.py; the file is memory-mapped and
+  // only the ids of its dictionary entries are mapped through the Dicts
+  void load_binary_oracle(const std::string& file, bool is_training);
+  static bool IsBinaryOracle(const std::string& file);
   cnn::Dict* nd; // dictionary of nonterminal types
 };
 
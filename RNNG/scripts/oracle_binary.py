@@ -0,0 +1,156 @@
+"""Convert a (discriminative) text oracle into the binary oracle format read by nt-parser
+
+Layout, all integers little-endian:
+
+    8 bytes   magic "RNNGBOR1"
+    u32       number of sentences, terminal symbols, POS tags, actions
+    u64       number of tokens, number of actions over all sentences
+    strings   terminal, POS and action dictionary, each entry as u32 length + UTF-8 bytes
+    padding   zero bytes up to a multiple of 8
+    u64       token offsets [sentences + 1]
+    u64       action offsets [sentences + 1]
+    i32       pos, raw, lc and unk ids [tokens each]
+    i32       action ids [actions]
+
+Ids index the dictionaries of the file. Dictionary entries are stored in
+order of first appearance (pos, raw, lc, unk, actions of each sentence), so
+nt-parser assigns the same ids as when it reads the text oracle.
+"""
+
+import argparse
+import io
+import re
+import struct
+import sys
+from array import array
+
+MAGIC = b'RNNGBOR1'
+_HEADER = struct.Struct('<8sIIIIQQ')
+# nt-parser (Oracle::ReadSentenceView) splits only at spaces and tabs
+_TOKEN = re.compile('[^ \t]+')
+
+ap = argparse.ArgumentParser(description='Convert a text oracle into a binary oracle')
+ap.add_argument('oracle', help='text oracle written by get_oracle.py')
+ap.add_argument('output', help='binary oracle file')
+
+def read_text_oracle(oracle_file):
+    """Yield (pos, raw, lc, unk, actions) for every block of a text oracle"""
+    lines = (line.rstrip('\n') for line in oracle_file)
+    for line in lines:
+        if len(line) == 0 or line[0] == '#':
+            continue
+        pos = _TOKEN.findall(line)
+        raw = _TOKEN.findall(next(lines))
+        lc = _TOKEN.findall(next(lines))
+        unk = _TOKEN.findall(next(lines))
+        if not(len(pos) == len(raw) == len(lc) == len(unk)):
+            raise ValueError('Mismatched lengths of input strings in oracle')
+        actions = []
+        for action in lines:
+            if len(action) == 0:
+                break
+            actions.append(action)
+        if actions.count('SHIFT') != len(raw):
+            raise ValueError('Mismatched number of tokens and SHIFTs in oracle')
+        yield pos, raw, lc, unk, actions
+
+class _Dictionary(object):
+    def __init__(self):
+        self.ids = {}
+        self.words = []
+
+    def convert(self, word):
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def pack(self):
+        output = []
+        for word in self.words:
+            encoded = word.encode('utf-8')
+            output.append(struct.pack('<I', len(encoded)))
+            output.append(encoded)
+        return b''.join(output)
+
+def _int_array(typecode, values=()):
+    output = array(typecode, values)
+    assert output.itemsize == {'i': 4, 'q': 8}[typecode]
+    if sys.byteorder != 'little':
+        output.byteswap()
+    return output
+
+def write_binary_oracle(sentences, output_file):
+    """Write the (pos, raw, lc, unk, actions) sentences to the open binary output_file"""
+    terms = _Dictionary()
+    pos_tags = _Dictionary()
+    action_types = _Dictionary()
+    token_offsets = [0]
+    action_offsets = [0]
+    streams = dict((name, array('i')) for name in ('pos', 'raw', 'lc', 'unk', 'actions'))
+    for pos, raw, lc, unk, actions in sentences:
+        streams['pos'].extend(pos_tags.convert(tag) for tag in pos)
+        streams['raw'].extend(terms.convert(word) for word in raw)
+        streams['lc'].extend(terms.convert(word) for word in lc)
+        streams['unk'].extend(terms.convert(word) for word in unk)
+        streams['actions'].extend(action_types.convert(action) for action in actions)
+        token_offsets.append(len(streams['pos']))
+        action_offsets.append(len(streams['actions']))
+    header = _HEADER.pack(MAGIC, len(token_offsets) - 1, len(terms.words), len(pos_tags.words),
+                          len(action_types.words), token_offsets[-1], action_offsets[-1])
+    dictionaries = terms.pack() + pos_tags.pack() + action_types.pack()
+    output_file.write(header)
+    output_file.write(dictionaries)
+    output_file.write(b'\0' * (-(len(header) + len(dictionaries)) % 8))
+    _int_array('q', token_offsets).tofile(output_file)
+    _int_array('q', action_offsets).tofile(output_file)
+    for name in ('pos', 'raw', 'lc', 'unk', 'actions'):
+        _int_array('i', streams[name]).tofile(output_file)
+
+def read_binary_oracle(path):
+    """Return the sentences of a binary oracle as (pos, raw, lc, unk, actions) string lists"""
+    with open(path, 'rb') as binary_file:
+        data = binary_file.read()
+    magic, n_sents, n_terms, n_pos, n_actions, n_tokens, n_action_ids = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(path + ' is not a binary oracle')
+    offset = _HEADER.size
+    dictionaries = []
+    for size in (n_terms, n_pos, n_actions):
+        words = []
+        for _ in range(size):
+            length, = struct.unpack_from('<I', data, offset)
+            words.append(data[offset + 4:offset + 4 + length].decode('utf-8'))
+            offset += 4 + length
+        dictionaries.append(words)
+    terms, pos_tags, action_types = dictionaries
+    offset += -offset % 8
+    def take(typecode, count):
+        values = _int_array(typecode)
+        values.frombytes(data[offset:offset + count * values.itemsize])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values, offset + count * values.itemsize
+    token_offsets, offset = take('q', n_sents + 1)
+    action_offsets, offset = take('q', n_sents + 1)
+    pos, offset = take('i', n_tokens)
+    raw, offset = take('i', n_tokens)
+    lc, offset = take('i', n_tokens)
+    unk, offset = take('i', n_tokens)
+    actions, offset = take('i', n_action_ids)
+    sentences = []
+    for i in range(n_sents):
+        start, end = token_offsets[i], token_offsets[i + 1]
+        sentences.append(([pos_tags[x] for x in pos[start:end]],
+                          [terms[x] for x in raw[start:end]],
+                          [terms[x] for x in lc[start:end]],
+                          [terms[x] for x in unk[start:end]],
+                          [action_types[x] for x in actions[action_offsets[i]:action_offsets[i + 1]]]))
+    return sentences
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    with io.open(args.oracle, 'r', encoding='utf-8', newline='\n') as oracle_file:
+        with open(args.output, 'wb') as output_file:
+            write_binary_oracle(read_text_oracle(oracle_file), output_file)
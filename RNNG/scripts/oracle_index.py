@@ -0,0 +1,170 @@
+"""Random access to the blank-line-separated sentence blocks of an .oracle file
+
+The byte offset of every block is stored in a sidecar index (<oracle>.idx):
+
+    8 bytes   magic "RNNGOIX2"
+    u64       size of the oracle file when it was indexed
+    u64       its modification time (st_mtime_ns)
+    u64       number of blocks n
+    u64       offsets [n + 1], the last one being the end of the file
+
+Block i spans the bytes offsets[i]:offsets[i + 1] including its trailing
+empty line(s), so concatenating blocks gives a valid oracle again. An index
+whose size or time differs from the oracle's, or whose offsets are not block
+starts of the oracle, is rebuilt.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'RNNGOIX2'
+_HEADER = struct.Struct('<8sQQQ')
+
+ap = argparse.ArgumentParser(description='Index an oracle file and print single sentence blocks')
+ap.add_argument('oracle', help='oracle file')
+ap.add_argument('--block', help='print block i or the blocks of the slice i:j')
+ap.add_argument('--rebuild', action='store_true', help='rebuild the index even if it is up to date')
+
+def index_path(oracle_path):
+    return oracle_path + '.idx'
+
+def find_blocks(oracle_file):
+    """Return the start offsets of all blocks of the binary oracle_file plus its end offset"""
+    offsets = array('Q')
+    offset = 0
+    in_block = False
+    for line in oracle_file:
+        if line.strip():
+            if not in_block:
+                offsets.append(offset)
+                in_block = True
+        else:
+            in_block = False
+        offset += len(line)
+    offsets.append(offset)
+    return offsets
+
+def build_index(oracle_path, output_path=None):
+    with open(oracle_path, 'rb') as oracle_file:
+        # stat before reading: a change while indexing makes the index stale
+        stat = os.fstat(oracle_file.fileno())
+        offsets = find_blocks(oracle_file)
+    with open(output_path or index_path(oracle_path), 'wb') as index_file:
+        index_file.write(_HEADER.pack(MAGIC, stat.st_size, stat.st_mtime_ns, len(offsets) - 1))
+        _write_u64(offsets, index_file)
+    return offsets
+
+def load_index(path):
+    """Return the oracle size, the oracle modification time and the offsets of an index"""
+    with open(path, 'rb') as index_file:
+        header = index_file.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+            raise ValueError(path + ' is not an oracle index')
+        magic, size, mtime_ns, count = _HEADER.unpack(header)
+        offsets = array('Q')
+        offsets.fromfile(index_file, count + 1)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return size, mtime_ns, offsets
+
+def is_block_start(data, offset):
+    """Return whether a block can start at offset of the oracle bytes data,
+    i.e. offset is 0 or follows an empty line"""
+    if offset == 0:
+        return True
+    if offset > len(data) or data[offset - 1:offset] != b'\n':
+        return False
+    line_start = data.rfind(b'\n', 0, offset - 1) + 1
+    return not data[line_start:offset].strip()
+
+def valid_offsets(data, offsets):
+    """Return whether offsets can be the index of the oracle bytes data"""
+    if len(offsets) == 0 or offsets[-1] != len(data):
+        return False
+    previous = 0
+    for offset in offsets[:-1]:
+        if offset < previous or not is_block_start(data, offset):
+            return False
+        previous = offset
+    return True
+
+def _write_u64(values, output_file):
+    if sys.byteorder != 'little':
+        values = array('Q', values)
+        values.byteswap()
+    values.tofile(output_file)
+
+class OracleIndex(object):
+    """Sentence blocks of an oracle file, fetched by position without parsing the file.
+    The sidecar index is built (or rebuilt when the oracle changed) on first use."""
+
+    def __init__(self, oracle_path, rebuild=False):
+        self.oracle_path = oracle_path
+        self.index_path = index_path(oracle_path)
+        self._file = open(oracle_path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size > 0 else b''
+        self.offsets = None
+        if not rebuild and os.path.exists(self.index_path):
+            try:
+                size, mtime_ns, offsets = load_index(self.index_path)
+            except (ValueError, EOFError):
+                pass
+            else:
+                if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns) and valid_offsets(self._data, offsets):
+                    self.offsets = offsets
+        if self.offsets is None:
+            self.offsets = build_index(oracle_path, self.index_path)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def block_bytes(self, start, stop=None):
+        """Return the raw bytes of blocks start:stop (just block start if stop is None)"""
+        if stop is None:
+            stop = start + 1
+        return self._data[self.offsets[start]:self.offsets[stop]]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('oracle block index out of range')
+        return self.block_bytes(key).decode('utf-8')
+
+    def shard(self, n_shards, shard):
+        """Return the block range (start, stop) of shard number shard out of n_shards"""
+        return len(self) * shard // n_shards, len(self) * (shard + 1) // n_shards
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def parse_slice(text):
+    if ':' not in text:
+        return int(text)
+    start, stop = text.split(':', 1)
+    return slice(int(start) if start else None, int(stop) if stop else None)
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    with OracleIndex(args.oracle, args.rebuild) as index:
+        if args.block is None:
+            print('%d blocks indexed in %s' % (len(index), index.index_path))
+        else:
+            key = parse_slice(args.block)
+            blocks = index[key] if isinstance(key, slice) else [index[key]]
+            sys.stdout.write(''.join(blocks))
@@ -0,0 +1,140 @@
+"""Client of a long-running nt-parser (nt-parser --server)
+
+The server loads the model and dictionaries once and then parses oracle
+sentences. ParserClient either starts it as a child process and talks to it
+over stdin/stdout, or connects to a server listening on a Unix socket:
+
+    client = ParserClient(socket_path='/tmp/nt-parser.sock')
+    lines = client.parse_graminput(graminput, words_list)
+
+A batch is a sequence of oracle blocks followed by an END_OF_BATCH line; the
+server answers with one "sii ||| score ||| tree" line per sentence (sii counted
+from 0 in every batch) and echoes END_OF_BATCH. A sentence the server cannot
+parse gets an ERROR line instead, and parse raises ValueError once the rest of
+the batch has been answered."""
+
+import argparse
+import io
+import math
+import socket
+import subprocess
+import sys
+import threading
+
+from get_oracle import get_oracle, check_balanced
+from text_to_network_input import MAX_WINDOW
+
+END_OF_BATCH = '### END'
+ERROR = '### ERROR'
+PARSER = 'build/nt-parser/nt-parser'
+# cnn reserves three pools of --cnn-mem megabytes each. With a model bundle the
+# parameters take none of it, so it only has to hold the computation graph of the
+# longest sentence: measured about 12 MB plus 0.13 MB per token, doubled here
+CNN_MEM_BASE = 32
+CNN_MEM_PER_TOKEN = 0.25
+
+def cnn_mem(max_tokens):
+    """Return the --cnn-mem (MB) for sentences of at most max_tokens tokens"""
+    return CNN_MEM_BASE + int(math.ceil(CNN_MEM_PER_TOKEN * max_tokens))
+
+def parser_command(max_tokens=MAX_WINDOW, mem=None):
+    """Return the nt-parser command for sentences of at most max_tokens tokens,
+    or with a --cnn-mem of mem MB"""
+    if mem is None:
+        mem = cnn_mem(max_tokens)
+    # model.bundle is written by predict.sh (nt-parser --save_bundle)
+    return [PARSER, '--cnn-mem', str(mem), '--bundle', 'model.bundle', '--predict_only']
+
+PARSER_COMMAND = parser_command()
+
+ap = argparse.ArgumentParser(description='Parse an oracle file with a running nt-parser server')
+ap.add_argument('oracle', help='oracle file (get_oracle.py output)')
+ap.add_argument('--socket', help='Unix socket of the server (default: start nt-parser --server)')
+ap.add_argument('--max-window', type=int, default=MAX_WINDOW, help='number of tokens of the longest sentence, sets the --cnn-mem of a started server')
+
+class ParserClient(object):
+    def __init__(self, command=None, socket_path=None, max_tokens=MAX_WINDOW):
+        """Connect to the server at socket_path, or start one with command (by
+        default one for sentences of at most max_tokens tokens)"""
+        self.process = None
+        self.socket = None
+        if socket_path is None:
+            if command is None:
+                command = parser_command(max_tokens)
+            self.process = subprocess.Popen(command + ['--server'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self.writer = io.TextIOWrapper(self.process.stdin, encoding='utf-8', newline='\n')
+            self.reader = io.TextIOWrapper(self.process.stdout, encoding='utf-8')
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(socket_path)
+            self.writer = self.socket.makefile('w', encoding='utf-8', newline='\n')
+            self.reader = self.socket.makefile('r', encoding='utf-8')
+
+    def _send(self, blocks):
+        for block in blocks:
+            self.writer.write(block)
+        self.writer.write('\n' + END_OF_BATCH + '\n')
+        self.writer.flush()
+
+    def parse(self, blocks):
+        """Parse oracle blocks (strings ending with an empty line) and return
+        the "sii ||| score ||| tree" lines of the batch"""
+        # the server answers while it reads, so the batch is sent from another
+        # thread to keep both pipes from filling up
+        sender = threading.Thread(target=self._send, args=(blocks,))
+        sender.start()
+        lines = []
+        errors = []
+        line = None
+        for line in self.reader:
+            line = line.rstrip('\n')
+            if line == END_OF_BATCH:
+                break
+            if line.startswith(ERROR + ' '):
+                errors.append('sentence ' + line[len(ERROR) + 1:])
+            else:
+                lines.append(line)
+        sender.join()
+        if line != END_OF_BATCH:
+            raise IOError('nt-parser server closed the connection')
+        if errors:
+            raise ValueError('nt-parser could not parse ' + '; '.join(errors))
+        return lines
+
+    def parse_graminput(self, graminput, words_list):
+        """Parse (t ...) lines, e.g. those of pipeline.graminput_lines"""
+        def blocks():
+            for line_ctr, line in enumerate(graminput):
+                check_balanced(line, line_ctr + 1)
+                yield get_oracle(line, words_list)
+        return self.parse(blocks())
+
+    def close(self):
+        self.writer.close()
+        if self.process is not None:
+            self.process.wait()
+        if self.socket is not None:
+            self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_blocks(oracle_file):
+    block = []
+    for line in oracle_file:
+        block.append(line)
+        if line == '\n':
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block) + '\n'
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    with ParserClient(socket_path=args.socket, max_tokens=args.max_window) as client:
+        with io.open(args.oracle, 'r', encoding='utf-8') as oracle_file:
+            for line in client.parse(read_blocks(oracle_file)):
+                sys.stdout.write(line + '\n')
@@ -0,0 +1,111 @@
+"""Prediction pipeline of predict.sh as function calls in a single process
+
+text_to_network_input, get_oracle, evaluation and prediction_to_XML run
+in-process and hand their tokens and trees over in memory. Only nt-parser is
+run as a separate program, and only the requested artifacts are written."""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import evaluation
+import prediction_to_XML
+import span_output
+from get_oracle import write_oracle
+from parser_client import ParserClient, parser_command
+from text_to_network_input import tokenize, segment, GERMAN, UNICODE, MAX_WINDOW
+from vocabulary import load_vocabulary
+
+GRAMINPUT = 'graminput'
+PREDICT = 'predict'
+TEI = 'tei'
+EVALUATION = 'evaluation'
+SPANS = 'spans'
+ARTIFACTS = [GRAMINPUT, PREDICT, TEI, EVALUATION]
+
+ap = argparse.ArgumentParser(description='Predict the document structure of DATANAME.txt')
+ap.add_argument('file', help='DATANAME, i.e. the path of the document without .txt')
+ap.add_argument('--vocab', default='train.vocab', help='vocabulary file or train treebank')
+ap.add_argument('--max-window', type=int, default=MAX_WINDOW, help='maximum number of tokens per parser sentence (0: whole document)')
+ap.add_argument('--server', metavar='SOCKET', help='send the sentences to the nt-parser --server listening on SOCKET')
+ap.add_argument('--letters', choices=[GERMAN, UNICODE], default=GERMAN, help='characters that form words, all others become (c ...) tokens')
+ap.add_argument('--artifacts', nargs='*', choices=ARTIFACTS + [SPANS], default=ARTIFACTS, help='files to write (evaluation only if a ground truth exists, spans: DATANAME_spans.jsonl and DATANAME.spans)')
+
+def graminput_lines(txt_file, max_window=MAX_WINDOW, letters=GERMAN):
+    """Return the (t ...) lines of a text, one per window"""
+    tokens = tokenize(txt_file, letters=letters)
+    windows = segment(tokens, max_window) if max_window > 0 else [list(tokens)]
+    return ["(t" + "".join(" " + token for token in window) + ")" for window in windows]
+
+def longest_window(graminput):
+    """Return the number of tokens of the longest graminput line"""
+    # every token is a (w ...) or (c ...) and brackets in the text became [ ]
+    return max([line.count("(") - 1 for line in graminput] or [0])
+
+def run_parser(oracle_path, command):
+    """Run nt-parser on an oracle and return its "sii ||| score ||| tree" lines"""
+    command = command + ['-p', oracle_path]
+    output = subprocess.check_output(command, universal_newlines=True)
+    return output.splitlines()
+
+def parse(graminput, words_list, command=None, client=None):
+    """Parse the graminput lines, with a ParserClient if one is given. Otherwise
+    nt-parser is started (by default with the memory for the longest line) and
+    the oracle only lives in a temporary file for it."""
+    if client is not None:
+        return client.parse_graminput(graminput, words_list)
+    if command is None:
+        command = parser_command(longest_window(graminput))
+    with tempfile.TemporaryDirectory() as tmp:
+        oracle_path = os.path.join(tmp, 'input.oracle')
+        with io.open(oracle_path, 'w', encoding='utf-8') as oracle_file:
+            write_oracle(graminput, words_list, oracle_file)
+        return run_parser(oracle_path, command)
+
+def finish(document, graminput, prediction, artifacts=ARTIFACTS, letters=GERMAN):
+    """Evaluate the parser output (if a ground truth exists) and write the
+    corrected prediction, the .tei file and the span files of a document"""
+    if EVALUATION in artifacts and os.path.exists(document + '_Ground_Truth.txt'):
+        with io.open(document + '_Ground_Truth.txt', 'r', encoding='utf-8') as file_ground_truth:
+            list_gt = evaluation.read_ground_truth(file_ground_truth.read().splitlines())
+        list_pred = evaluation.read_prediction(prediction)
+        with io.open(document + '_evaluation.txt', 'w', encoding='utf-8') as evaluation_file:
+            evaluation.write_report(list_gt, list_pred, document, evaluation_file)
+    network_input = prediction_to_XML.read_network_input(graminput)
+    pred = prediction_to_XML.read_prediction(prediction)
+    tokens = prediction_to_XML.get_full_prediction(network_input, pred)
+    if SPANS in artifacts:
+        collector = span_output.SpanCollector()
+        tokens = collector.collect(tokens)
+    tei_path = document + '.tei' if TEI in artifacts else None
+    if PREDICT in artifacts:
+        with io.open(document + '_predict.txt', 'w', encoding='utf-8') as pred_file:
+            prediction_to_XML.write_outputs(tokens, pred_file, tei_path)
+    else:
+        prediction_to_XML.write_outputs(tokens, tei_path=tei_path)
+    if SPANS in artifacts:
+        span_output.write_spans(collector, document, letters)
+
+def predict_document(document, words_list, max_window=MAX_WINDOW, artifacts=ARTIFACTS, command=None, client=None, letters=GERMAN):
+    with io.open(document + '.txt', 'r', encoding='utf-8') as txt_file:
+        graminput = graminput_lines(txt_file, max_window, letters)
+    if GRAMINPUT in artifacts:
+        with io.open(document + '_graminput.txt', 'w', encoding='utf-8') as target_file:
+            target_file.write("\n".join(graminput))
+    prediction = parse(graminput, words_list, command, client)
+    finish(document, graminput, prediction, artifacts, letters)
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    words_list = load_vocabulary(args.vocab)
+    if args.server is None:
+        predict_document(args.file, words_list, args.max_window, args.artifacts, letters=args.letters)
+    else:
+        with ParserClient(socket_path=args.server) as client:
+            predict_document(args.file, words_list, args.max_window, args.artifacts, client=client, letters=args.letters)
+    if EVALUATION in args.artifacts and os.path.exists(args.file + '_Ground_Truth.txt'):
+        with io.open(args.file + '_evaluation.txt', 'r', encoding='utf-8') as evaluation_file:
+            sys.stdout.write(evaluation_file.read())
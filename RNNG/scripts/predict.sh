@@ -1,7 +1,15 @@
+[ train.vocab -nt train_set_add_t.txt ] || python3 get_dictionary.py train_set_add_t.txt -o train.vocab
+# dictionaries and parameters of the parser, so that it does not have to read train.oracle;
+# rebuilt when the parameters or train.oracle are newer; --cnn-mem only has to hold the parameters here
+[ model.bundle -nt ntparse_pos_0_2_32_128_16_128-pid7064.params ] && [ model.bundle -nt train.oracle ] || build/nt-parser/nt-parser --cnn-mem 300 -x -T train.oracle -P --lstm_input_dim 128 --hidden_dim 128 -m ntparse_pos_0_2_32_128_16_128-pid7064.params --save_bundle model.bundle
+# options after DATANAME (or without DATANAME) go to pipeline.py resp. predict_batch.py, e.g. --letters unicode
+case "$1" in
+    ""|-*)
+        # batch mode: predict every document in PLACE_YOUR_FILES_HERE with one parser run
+        python3 predict_batch.py PLACE_YOUR_FILES_HERE "$@"
+        exit;;
+esac
 FILE=PLACE_YOUR_FILES_HERE/$1
+shift
 python3 graminput_to_text.py $FILE.txt
-python3 text_to_network_input.py $FILE.txt
-python get_oracle.py train_set_add_t.txt ${FILE}_graminput.txt > $FILE.oracle
-build/nt-parser/nt-parser --cnn-mem 2500 -x -T train.oracle -p $FILE.oracle -C ${FILE}_graminput.txt -P --lstm_input_dim 128 --hidden_dim 128 -m ntparse_pos_0_2_32_128_16_128-pid7064.params > ${FILE}_predict.txt
-python3 evaluation.py $FILE
-python3 prediction_to_XML.py $FILE
\ No newline at end of file
+python3 pipeline.py $FILE "$@"
\ No newline at end of file
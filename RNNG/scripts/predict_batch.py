@@ -0,0 +1,98 @@
+"""Predict every document in PLACE_YOUR_FILES_HERE with a single nt-parser run
+
+For each DATANAME.txt the same files as with ./predict.sh DATANAME are written
+(DATANAME_graminput.txt, DATANAME_predict.txt, DATANAME.tei and, if a ground
+truth exists, DATANAME_evaluation.txt). The vocabulary is loaded once and the
+oracles of all documents are concatenated, so nt-parser loads the model and
+its dictionaries only once for the whole batch."""
+
+import argparse
+import io
+import os
+import tempfile
+
+from get_oracle import write_oracle
+from parser_client import ParserClient, parser_command
+from pipeline import graminput_lines, longest_window, run_parser, finish, MAX_WINDOW
+from predict_sharded import run_parser_sharded
+from text_to_network_input import GERMAN, UNICODE
+from vocabulary import load_vocabulary
+
+PLACE = 'PLACE_YOUR_FILES_HERE'
+# files written by the pipeline, which are no input documents
+DERIVED_SUFFIXES = ('_graminput.txt', '_predict.txt', '_Ground_Truth.txt', '_evaluation.txt')
+
+ap = argparse.ArgumentParser(description='Predict all documents of a directory with one parser run')
+ap.add_argument('directory', nargs='?', default=PLACE, help='directory with the DATANAME.txt files')
+ap.add_argument('--vocab', default='train.vocab', help='vocabulary file or train treebank')
+ap.add_argument('--server', metavar='SOCKET', help='send the sentences to the nt-parser --server listening on SOCKET')
+ap.add_argument('--shards', type=int, default=1, help='number of parser processes that parse the batch together')
+ap.add_argument('--max-window', type=int, default=MAX_WINDOW, help='maximum number of tokens per parser sentence (0: whole document)')
+ap.add_argument('--letters', choices=[GERMAN, UNICODE], default=GERMAN, help='characters that form words, all others become (c ...) tokens')
+
+def find_documents(directory):
+    """Return the DATANAME paths (without .txt) of all input documents of directory"""
+    documents = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.txt') and not name.endswith(DERIVED_SUFFIXES):
+            documents.append(os.path.join(directory, name[:-4]))
+    return documents
+
+def write_batch_oracle(documents, words_list, oracle_file, max_window=MAX_WINDOW, letters=GERMAN):
+    """Write the graminput of every document and append its oracle blocks to
+    the batch oracle. Return the graminput lines of every document."""
+    graminputs = []
+    for document in documents:
+        with io.open(document + '.txt', 'r', encoding='utf-8') as txt_file:
+            graminput = graminput_lines(txt_file, max_window, letters)
+        with io.open(document + '_graminput.txt', 'w', encoding='utf-8') as target_file:
+            target_file.write("\n".join(graminput))
+        write_oracle(graminput, words_list, oracle_file)
+        graminputs.append(graminput)
+    return graminputs
+
+def split_predictions(lines, sentence_counts):
+    """Distribute the "sii ||| score ||| tree" lines of a batch run over the documents,
+    renumbering sii from 0 in every document. Returns one list of lines per document."""
+    starts = [0]
+    for count in sentence_counts:
+        starts.append(starts[-1] + count)
+    outputs = [[] for _ in sentence_counts]
+    document = 0
+    for line in lines:
+        sii, rest = line.split(' ||| ', 1)
+        sii = int(sii)
+        while sii >= starts[document + 1]:
+            document += 1
+        outputs[document].append(str(sii - starts[document]) + ' ||| ' + rest)
+    return outputs
+
+def main():
+    args = ap.parse_args()
+    documents = find_documents(args.directory)
+    if len(documents) == 0:
+        return
+    words_list = load_vocabulary(args.vocab)
+    if args.server is None:
+        # the batch oracle (and its index) must not end up among the documents
+        with tempfile.TemporaryDirectory() as tmp:
+            oracle_path = os.path.join(tmp, 'batch.oracle')
+            with io.open(oracle_path, 'w', encoding='utf-8') as oracle_file:
+                graminputs = write_batch_oracle(documents, words_list, oracle_file, args.max_window, args.letters)
+            command = parser_command(max(longest_window(graminput) for graminput in graminputs))
+            if args.shards > 1:
+                lines = run_parser_sharded(oracle_path, args.shards, command)
+            else:
+                lines = run_parser(oracle_path, command)
+    else:
+        oracle_file = io.StringIO()
+        graminputs = write_batch_oracle(documents, words_list, oracle_file, args.max_window, args.letters)
+        with ParserClient(socket_path=args.server) as client:
+            lines = client.parse([oracle_file.getvalue()])
+    sentence_counts = [len(graminput) for graminput in graminputs]
+    predictions = split_predictions(lines, sentence_counts)
+    for document, graminput, prediction in zip(documents, graminputs, predictions):
+        finish(document, graminput, prediction, letters=args.letters)
+
+if __name__ == '__main__':
+    main()
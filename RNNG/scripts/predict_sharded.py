@@ -0,0 +1,128 @@
+"""Parse an oracle with several nt-parser processes at once
+
+The oracle is split into --shards contiguous block ranges (see
+oracle_index.OracleIndex.shard), every range is parsed by its own nt-parser
+process and the "sii ||| score ||| tree" lines are merged back in the order of
+the oracle, with sii counted over the whole oracle. The result is the same file
+a single nt-parser run prints.
+
+Every process reserves three times its --cnn-mem, so by default --cnn-mem is
+sized for the longest sentence of the oracle and no more processes are started
+than fit into the available memory."""
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from oracle_index import OracleIndex
+from parser_client import PARSER_COMMAND, cnn_mem, parser_command
+
+# memory of a parser process besides its three pools of --cnn-mem MB each (MB)
+PROCESS_OVERHEAD = 32
+
+ap = argparse.ArgumentParser(description='Parse an oracle file with one nt-parser process per shard')
+ap.add_argument('oracle', help='oracle file (get_oracle.py output)')
+ap.add_argument('--shards', type=int, help='number of parser processes (default: number of cores, at most as many as fit into the available memory)')
+ap.add_argument('--cnn-mem', type=int, help='--cnn-mem of every parser process in MB (default: enough for the longest sentence)')
+ap.add_argument('-o', '--output', help='output file (default: stdout)')
+
+def available_memory():
+    """Return the memory available for new processes in bytes, or None if unknown"""
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError):
+        return None
+
+def default_shards(mem):
+    """Return the number of cores, but at most as many parser processes with a
+    --cnn-mem of mem MB as fit into the available memory (at least one)"""
+    n_shards = os.cpu_count() or 1
+    available = available_memory()
+    if available is not None:
+        n_shards = min(n_shards, available // ((3 * mem + PROCESS_OVERHEAD) << 20))
+    return max(n_shards, 1)
+
+def longest_sentence(index):
+    """Return the number of tokens of the longest sentence of an indexed oracle"""
+    longest = 0
+    for i in range(len(index)):
+        # the third line of a block holds the tokens of the sentence
+        lines = index.block_bytes(i).split(b'\n', 3)
+        if len(lines) > 2:
+            longest = max(longest, len(lines[2].split()))
+    return longest
+
+def shard_ranges(index, n_shards):
+    """Return the non-empty block ranges (start, stop) of the shards"""
+    ranges = [index.shard(n_shards, shard) for shard in range(n_shards)]
+    return [(start, stop) for start, stop in ranges if stop > start]
+
+def start_parsers(index, ranges, tmp, command=PARSER_COMMAND):
+    """Write the oracle of every shard to tmp and start a parser on it. Returns the
+    processes and the paths of their outputs."""
+    # every process gets a single core, a multi-threaded BLAS would oversubscribe it
+    env = dict(os.environ, OMP_NUM_THREADS='1')
+    processes = []
+    output_paths = []
+    for shard, (start, stop) in enumerate(ranges):
+        oracle_path = os.path.join(tmp, 'shard%d.oracle' % shard)
+        output_path = os.path.join(tmp, 'shard%d.out' % shard)
+        with open(oracle_path, 'wb') as oracle_file:
+            oracle_file.write(index.block_bytes(start, stop))
+        with open(output_path, 'wb') as output_file:
+            processes.append(subprocess.Popen(command + ['-p', oracle_path], stdout=output_file, env=env))
+        output_paths.append(output_path)
+    return processes, output_paths
+
+def merge_outputs(ranges, output_paths, out):
+    """Write the parser outputs of all shards to out, adding the first sentence
+    number of the shard to every sii"""
+    for (start, stop), output_path in zip(ranges, output_paths):
+        with io.open(output_path, 'r', encoding='utf-8') as output_file:
+            for line in output_file:
+                sii, rest = line.split(' ||| ', 1)
+                out.write(str(int(sii) + start) + ' ||| ' + rest)
+
+def run_sharded(oracle_path, n_shards, out, command=PARSER_COMMAND, rebuild=False):
+    with OracleIndex(oracle_path, rebuild) as index:
+        ranges = shard_ranges(index, max(n_shards, 1))
+        with tempfile.TemporaryDirectory() as tmp:
+            processes, output_paths = start_parsers(index, ranges, tmp, command)
+            for process in processes:
+                process.wait()
+            for process in processes:
+                if process.returncode != 0:
+                    raise subprocess.CalledProcessError(process.returncode, process.args)
+            merge_outputs(ranges, output_paths, out)
+
+def run_parser_sharded(oracle_path, n_shards, command=PARSER_COMMAND):
+    """Like pipeline.run_parser, but with n_shards parser processes running
+    command (see parser_client.parser_command). The oracle is a freshly written
+    one, so its index is always rebuilt."""
+    out = io.StringIO()
+    run_sharded(oracle_path, n_shards, out, command, rebuild=True)
+    return out.getvalue().splitlines()
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    mem = args.cnn_mem
+    if mem is None:
+        with OracleIndex(args.oracle) as index:
+            mem = cnn_mem(longest_sentence(index))
+    n_shards = args.shards if args.shards is not None else default_shards(mem)
+    command = parser_command(mem=mem)
+    if args.output is None:
+        run_sharded(args.oracle, n_shards, sys.stdout, command)
+    else:
+        with io.open(args.output, 'w', encoding='utf-8') as out:
+            run_sharded(args.oracle, n_shards, out, command)
@@ -1,9 +1,12 @@
 """Convert prediction of Network to .tei file and correct the _predict.txt file"""
 
-from lxml import etree
-import lxml.etree as ET
-import time
 import argparse
+import io
+import math
+import re
+import shutil
+import tempfile
+import time
 
 #file_network_input = open("/home/svogel/projects/textimaging/rnng-master/Franz_Kafka_Das_Urteil_graminput.txt", "r") #Thomas_Mann_Der_Tod_in_Venedig_Neu_graminput.txt", "r") #
 #file_pred = open("/home/svogel/projects/textimaging/rnng-master/Franz_Kafka_Das_Urteil_predict.txt", "r") #Thomas_Mann_Der_Tod_in_Venedig_Neu_predict.txt","r")  # 
@@ -11,197 +14,385 @@ import argparse
 p = argparse.ArgumentParser()
 p.add_argument('file')
 
-if __name__ == "__main__":
-    args = p.parse_args()
-    file_network_input = open(args.file + '_graminput.txt', 'r')
-    file_pred = open(args.file + '_predict.txt', 'r')
-    def get_clips(string):
-        first = True
-        clips = ""
-        for char in string:
-            if char == ")":
-                clips += "" if first else ")"
-                first = False
-        return clips
-
-    network_input = ["(t"]
-    lines = file_network_input.read().splitlines()
-    for line in lines:
-        # correctly working with multiple (t: Convert all t into only an outer t
-        network_input += line[3:-1].split(" ")
-    network_input[-1] += ")"
-
-    pred = ["(t"]
-    lines = file_pred.read().splitlines()
-    for line in lines:
-        split = line[:-1].split(" ")
-        help_ = 0 #for finding "(t ... "
-        for elem in split:
-            if("(t" == elem):
-                break
-            help_ += 1
-        pred += split[help_+1:]
-    pred[-1] += ")"
-
-    def get_full_prediction(network_input, pred):
-        """Network outputs some weird changes, i.e. (XX ) instead of (w ) and some words are not correctly written
-        
-        This method corrects the output"""
-
-        w_and_c = []
-        #print("Network: ", network_input[:100])
-        #print("pred: ", pred[:100])
-        for i in  range(len(network_input)):
-            if("(w" in network_input[i] or "(c" in network_input[i]):
-                w_and_c.append(network_input[i] + " " + network_input[i+1])
-
-        counter = 0
-        helpBool = False #for let the words from prediction out
-        full_pred = ""
-        for i in range(len(pred)):
-            if(helpBool):
-                helpBool = False
-            elif("(XX" in pred[i]):
-                full_pred += w_and_c[counter] + get_clips(pred[i+1]) + " "
-                counter +=1
-                helpBool = True
+def get_clips(string):
+    first = True
+    clips = ""
+    for char in string:
+        if char == ")":
+            clips += "" if first else ")"
+            first = False
+    return clips
+
+def _close_last(tokens):
+    """Yield tokens, appending ")" to the last one"""
+    previous = next(tokens)
+    for token in tokens:
+        yield previous
+        previous = token
+    yield previous + ")"
+
+def read_network_input(lines):
+    """Yield the tokens of the graminput lines as one outer (t"""
+    def tokens():
+        yield "(t"
+        for line in lines:
+            # correctly working with multiple (t: Convert all t into only an outer t
+            for token in line[3:-1].split(" "):
+                yield token
+    return _close_last(tokens())
+
+def read_prediction(lines):
+    """Yield the tokens of the predicted trees as one outer (t"""
+    def tokens():
+        yield "(t"
+        for line in lines:
+            split = line[:-1].split(" ")
+            if "(t" in split:
+                for token in split[split.index("(t")+1:]:
+                    yield token
+    return _close_last(tokens())
+
+def get_w_and_c(network_input):
+    """Yield every (w and (c of the network input together with the token after it"""
+    previous = None
+    for token in network_input:
+        if previous is not None:
+            yield previous, token
+        previous = token if ("(w" in token or "(c" in token) else None
+    if previous is not None:
+        raise IndexError("network input ends with " + previous)
+
+def get_full_prediction(network_input, pred):
+    """Network outputs some weird changes, i.e. (XX ) instead of (w ) and some words are not correctly written
+
+    This generator corrects the output: it walks the prediction and the network
+    input together and yields the corrected tokens"""
+    w_and_c = get_w_and_c(network_input)
+    pred = iter(pred)
+    def merged():
+        for token in pred:
+            if("(XX" in token):
+                clipped = next(pred, None)
+                word = next(w_and_c, None)
+                if clipped is None or word is None:
+                    raise IndexError("prediction does not match the network input")
+                clips = get_clips(clipped)
+                yield word[0]
+                yield word[1] + clips
             else:
-                full_pred += pred[i] + " "
-            
-        return full_pred[:-2]
-
-    def create_xml(full_pred):
-        """Convert the corrected predicted output to a complete .tei file"""
-        publication_stmt = ["Timestamp", "Number of tokens", "Number of unknown tokens",
-                            "Number of word forms", "TTR", "Guiraud", "MTLD",
-                            "Number of punctuation marks", "Number of lemmata", "Number of segments",
-                            "Number of level-1 segments", "Number of level-2 segments",
-                            "Number of level-3 segments", "Number of level-4 segments",
-                            "Number of level-5 segments", "Number of level-6 segments",
-                            "Number of level-7 segments", "Maximum segment level", "Number of quotes",
-                            "Number of sentences", "Number of level-1 sentences",
-                            "Number of level-2 sentences", "Number of level-3 sentences",
-                            "Maximum sentence level", "Number of paragraphs", "Number of divisions",
-                            "Number of captions", "Number of tables","Number of named entities",
-                            "Number of nouns", "Number of verbs", "Number of adjectives",
-                            "Number of adverbs"]
-        elements = []
-        preds = full_pred.split(" ")
-        s_count = 0
-        s_count_deep = [0,0,0,0,0,0]
-        s_deep = 1
-        seg_count = 0
-        seg_count_deep = [0,0,0,0,0,0,0,0,0]
-        seg_deep = 1
-        w_count = 0
-        c_count = 0
-        
-        tei = ET.Element("TEI", id="TEI1")
-        elements.append(ET.SubElement(tei, "teiHeader"))
-        elements.append(ET.SubElement(elements[0],"fileDesc"))
-        elements.append(ET.SubElement(elements[1],"titleStmt"))
-        elements.append(ET.SubElement(elements[2],"title"))
-        elements[3].text = "PlainText"
-        elements.append(ET.SubElement(elements[1],"publicationStmt"))
-
-        for stmt in publication_stmt:
-            elements.append(ET.SubElement(elements[4],"idno", type=stmt))
-            elements[-1].text = "0"
-            
-        elements.append(ET.SubElement(elements[1],"sourceDesc"))
-        elements.append(ET.SubElement(elements[38],"p", Name= "TTLab-Corpus; tagging by RNNG prediction from Fabian Vogel and Pascal Fischer"))
-        stack = [tei]
-        elements.append(ET.SubElement(tei, "text", id="text1"))
-        stack.append(elements[-1])
-        elements.append(ET.SubElement(stack[-1], "body", id="body1"))
-        stack.append(elements[-1])
-        for pred in preds[1:]:
+                yield token
+    tokens = merged()
+    previous = next(tokens)
+    first = True
+    for token in tokens:
+        yield previous
+        previous = token
+        first = False
+    # the closing bracket of the outer (t is dropped, an empty last token
+    # takes the space in front of it instead
+    if previous or first:
+        yield previous[:-1]
+
+def write_prediction(tokens, pred_file):
+    """Write the tokens to pred_file, separated by spaces, while passing them on"""
+    separator = ""
+    for token in tokens:
+        pred_file.write(separator + token)
+        separator = " "
+        yield token
+
+PUBLICATION_STMT = ["Timestamp", "Number of tokens", "Number of unknown tokens",
+                    "Number of word forms", "TTR", "Guiraud", "MTLD",
+                    "Number of punctuation marks", "Number of lemmata", "Number of segments",
+                    "Number of level-1 segments", "Number of level-2 segments",
+                    "Number of level-3 segments", "Number of level-4 segments",
+                    "Number of level-5 segments", "Number of level-6 segments",
+                    "Number of level-7 segments", "Maximum segment level", "Number of quotes",
+                    "Number of sentences", "Number of level-1 sentences",
+                    "Number of level-2 sentences", "Number of level-3 sentences",
+                    "Maximum sentence level", "Number of paragraphs", "Number of divisions",
+                    "Number of captions", "Number of tables","Number of named entities",
+                    "Number of nouns", "Number of verbs", "Number of adjectives",
+                    "Number of adverbs"]
+SOURCE = "TTLab-Corpus; tagging by RNNG prediction from Fabian Vogel and Pascal Fischer"
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+SPOOL_SIZE = 1 << 20
+
+# a factor of the MTLD ends when the type-token ratio of its words falls to this value
+MTLD_THRESHOLD = 0.72
+
+class TextStatistics(object):
+    """The statistics of the publicationStmt, counted while the tokens are read
+
+    Only the word forms are kept, so the memory grows with the vocabulary, not
+    with the text. MTLD is the forward MTLD (McCarthy and Jarvis, 2010),
+    computed incrementally."""
+
+    def __init__(self):
+        self.words = 0
+        self.punctuation = 0
+        self.quotes = 0
+        self.sentences = 0
+        self.sentence_levels = [0,0,0,0,0,0]
+        self.segments = 0
+        self.segment_levels = [0,0,0,0,0,0,0,0,0]
+        self.word_forms = set()
+        self.forms = 0
+        self.mtld_factors = 0
+        self.factor_forms = set()
+        self.factor_length = 0
+
+    def word(self):
+        self.words += 1
+
+    def word_form(self, form):
+        self.word_forms.add(form)
+        self.forms += 1
+        self.factor_forms.add(form)
+        self.factor_length += 1
+        if len(self.factor_forms) <= MTLD_THRESHOLD * self.factor_length:
+            self.mtld_factors += 1
+            self.factor_forms = set()
+            self.factor_length = 0
+
+    def sentence(self, level):
+        self.sentences += 1
+        self.sentence_levels[level -1] += 1
+
+    def segment(self, level):
+        self.segments += 1
+        self.segment_levels[level -1] += 1
+
+    def ttr(self):
+        return len(self.word_forms) / self.forms if self.forms else 0
+
+    def guiraud(self):
+        return len(self.word_forms) / math.sqrt(self.forms) if self.forms else 0
+
+    def mtld(self):
+        factors = self.mtld_factors
+        if self.factor_length > 0:
+            # the unfinished factor counts in proportion to how far its TTR has fallen
+            ttr = len(self.factor_forms) / self.factor_length
+            factors += (1 - ttr) / (1 - MTLD_THRESHOLD)
+        # a text that never falls to the threshold is shorter than one factor
+        return self.forms / factors if factors > 0 else self.forms
+
+    def values(self):
+        """Return the values of PUBLICATION_STMT as strings"""
+        stats = ["0"] * len(PUBLICATION_STMT)
+        stats[0] = time.strftime("%d.%m.%Y")
+        stats[1] = str(self.words)
+        stats[2] = str(self.words)
+        stats[3] = str(len(self.word_forms))
+        stats[4] = "%.4f" % self.ttr()
+        stats[5] = "%.4f" % self.guiraud()
+        stats[6] = "%.4f" % self.mtld()
+        stats[7] = str(self.punctuation)
+        stats[9] = str(self.segments)
+        for i in range(7):
+            stats[10+i] = str(self.segment_levels[i])
+        stats[17] = str(sum(1 for count in self.segment_levels[:7] if count > 0)) # maximum segment level
+        stats[18] = str(self.quotes)
+        stats[19] = str(self.sentences)
+        for i in range(3):
+            stats[20+i] = str(self.sentence_levels[i])
+        stats[23] = str(sum(1 for count in self.sentence_levels[:3] if count > 0)) # maximum sentence level
+        return stats
+
+# libxml2 indents by two spaces per level, but at most 30 levels deep
+MAX_INDENT_LEVEL = 30
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_TEXT_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", "\r": "&#13;"}
+_ATTRIBUTE_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#9;"}
+_TEXT_SPECIALS = re.compile('[&<>\r]')
+_ATTRIBUTE_SPECIALS = re.compile('[&<>"\n\r\t]')
+
+def _check_xml_string(value):
+    if _INVALID_XML_CHARS.search(value):
+        raise ValueError("All strings must be XML compatible: Unicode or ASCII, no NULL bytes or control characters")
+    return value
+
+class _Node(object):
+    __slots__ = ('tag', 'attrib', 'text', 'level', 'formatted', 'started')
+
+    def __init__(self, tag, attrib, level):
+        self.tag = tag
+        self.attrib = attrib
+        self.text = None
+        self.level = level
+        self.formatted = True # children on their own indented lines
+        self.started = False # ">" written
+
+class PrettyXMLWriter(object):
+    """Writes an element tree while it is built, in exactly the layout of
+    etree.tostring(tree, pretty_print=True) (i.e. of libxml2's formatter).
+
+    Like with the ElementTree API, element() adds a child to the innermost open
+    element and text() sets the text of the element added last, so an element is
+    only written once the next one is added. root is the already opened element
+    the tree starts in."""
+
+    def __init__(self, out, root):
+        self.out = out
+        self.stack = [root]
+        self.last = None
+
+    def _indent(self, level):
+        self.out.write("  " * min(level, MAX_INDENT_LEVEL))
+
+    def _flush(self):
+        """Write the start tag (and text) of the element added last"""
+        node = self.last
+        if node is None:
+            return
+        self.last = None
+        is_open = self.stack[-1] is node
+        parent = self.stack[-2] if is_open else self.stack[-1]
+        if parent.formatted:
+            self._indent(node.level)
+        self.out.write("<" + node.tag)
+        for name, value in node.attrib:
+            self.out.write(" " + name + '="' + _ATTRIBUTE_SPECIALS.sub(lambda m: _ATTRIBUTE_ESCAPES[m.group(0)], value) + '"')
+        # libxml2 does not format the content of elements with text
+        node.formatted = parent.formatted and node.text is None
+        if node.text is not None:
+            self.out.write(">" + _TEXT_SPECIALS.sub(lambda m: _TEXT_ESCAPES[m.group(0)], node.text))
+            node.started = True
+        if not is_open:
+            self._end(node, parent)
+
+    def _end(self, node, parent):
+        if not node.started:
+            self.out.write("/>")
+        else:
+            if node.formatted:
+                self._indent(node.level)
+            self.out.write("</" + node.tag + ">")
+        if parent.formatted:
+            self.out.write("\n")
+
+    def element(self, tag, attrib=(), push=False):
+        """Add an element to the innermost open element; with push it becomes the innermost one"""
+        self._flush()
+        parent = self.stack[-1]
+        if not parent.started:
+            self.out.write(">\n" if parent.formatted else ">")
+            parent.started = True
+        node = _Node(tag, [(name, _check_xml_string(value)) for name, value in attrib], parent.level + 1)
+        if push:
+            self.stack.append(node)
+        self.last = node
+        return node
+
+    def text(self, txt):
+        self.last.text = _check_xml_string(txt)
+
+    def close(self):
+        """Close all open elements but the root"""
+        while len(self.stack) > 1:
+            self.pop()
+        self._flush()
+
+    def pop(self):
+        """Close the innermost open element (but not the root)"""
+        self._flush()
+        node = self.stack.pop()
+        self._end(node, self.stack[-1])
+        return node
+
+def create_xml(tokens, path):
+    """Convert the corrected predicted tokens (get_full_prediction) to a complete .tei file
+
+    The body is written to a spool file while the tokens are read, the header
+    with the statistics of the whole text is put in front of it at the end."""
+    stats = TextStatistics()
+    s_deep = 1
+    seg_deep = 1
+
+    tei = _Node("TEI", [("id", "TEI1")], 0)
+    tei.started = True
+    with tempfile.TemporaryFile('w+', encoding='utf-8', newline='', buffering=SPOOL_SIZE) as spool:
+        writer = PrettyXMLWriter(spool, tei)
+        writer.element("text", [("id", "text1")], push=True)
+        writer.element("body", [("id", "body1")], push=True)
+        tokens = iter(tokens)
+        previous = next(tokens)
+        for pred in tokens:
+            if(previous == "(w"):
+                stats.word_form(pred.replace(")", ""))
+            if('»' in previous):
+                stats.quotes += 1
+            previous = pred
             if(pred == "(s"):
-                elements.append(ET.SubElement(stack[-1], "s", id="s"+str(s_count), n=str(s_deep)))
-                stack.append(elements[-1])
-                s_count += 1
-                s_count_deep[s_deep -1] += 1
+                writer.element("s", [("id", "s"+str(stats.sentences)), ("n", str(s_deep))], push=True)
+                stats.sentence(s_deep)
                 s_deep += 1
-                #if(s_deep == 4):
-                #    print(s_deep)
             elif(pred == "(seg"):
-                elements.append(ET.SubElement(stack[-1], "seg", id="seg"+str(seg_count), n=str(seg_deep+1)))
-                stack.append(elements[-1])
-                seg_count += 1
-                seg_count_deep[seg_deep -1] += 1
+                writer.element("seg", [("id", "seg"+str(stats.segments)), ("n", str(seg_deep+1))], push=True)
+                stats.segment(seg_deep)
                 seg_deep += 1
             elif(pred == "(w"):
-                elements.append(ET.SubElement(stack[-1], "w", id="w"+str(w_count), lemma="unknown", type="unknown", ana="unknown"))
-                w_count += 1
+                writer.element("w", [("id", "w"+str(stats.words)), ("lemma", "unknown"), ("type", "unknown"), ("ana", "unknown")])
+                stats.word()
             elif(pred == "(c"):
-                elements.append(ET.SubElement(stack[-1], "c", type="PUN"))
-                c_count += 1
+                writer.element("c", [("type", "PUN")])
+                stats.punctuation += 1
             else:
-                txt= ""
-                clips = -1
-                for char in pred:
-                    if(char == ")"):
-                        clips += 1
-                    else:
-                        txt += char
-                elements[-1].text = txt
+                clips = pred.count(")") - 1
+                writer.text(pred.replace(")", ""))
                 for i in range(clips):
-                    if(stack[-1].tag == "s"):
+                    if len(writer.stack) == 1:
+                        raise IndexError("prediction closes more elements than it opens")
+                    if(writer.stack[-1].tag == "s"):
                         s_deep -= 1
                     else:
                         seg_deep -= 1
-                    stack.pop()
-                elements.append(ET.SubElement(stack[-1], "c",))
-                elements[-1].text= " "
-        #print("Satztiefen: ", s_count_deep)                
-        #print("Segmenttiefen: ", seg_count_deep)                
-
-        elements[5].text= time.strftime("%d.%m.%Y")
-        elements[6].text= str(w_count)
-        elements[7].text= str(w_count)
-        words = []
-        quotes = 0
-        
-        for i in range(len(preds)-1):
-            if(preds[i] == "(w"):
-                word = ""
-                for char in preds[i+1]:
-                    if(char != ")"):
-                        word += char
-                words.append(word)
-            if('»' in preds[i]):
-                quotes += 1
-
-        elements[8].text = str(len(list(set(words))))
-        elements[12].text = str(c_count)
-        elements[14].text = str(seg_count)
-        max_seg_lvl = 0
-        
-        for i in range(7):
-            elements[15+i].text = str(seg_count_deep[i])
-            if(seg_count_deep[i] > 0):
-                max_seg_lvl += 1
-
-        elements[22].text = str(max_seg_lvl)
-        elements[23].text = str(quotes)
-        elements[24].text = str(s_count)
-        max_s_lvl = 0
-        for i in range(3):
-            elements[25+i].text = str(s_count_deep[i])
-            if(s_count_deep[i] > 0):
-                max_s_lvl += 1
-        elements[28].text = str(max_s_lvl)
-                
-        
-
-        tree = ET.ElementTree(tei)
-        with open(args.file+".tei", "wb") as writter:
-            writter.write(etree.tostring(tree, pretty_print=True,\
-                                        xml_declaration=True,encoding='UTF-8'))
-
-    full_pred = get_full_prediction(network_input, pred)
-    # safe the corrected version of the prediction
-    with open(args.file + '_predict.txt',"w") as pred_file:
-        pred_file.write(full_pred)
-    create_xml(full_pred)
+                    writer.pop()
+                writer.element("c")
+                writer.text(" ")
+        writer.close()
+
+        with io.open(path, "w", encoding="utf-8", newline="") as out:
+            out.write(XML_DECLARATION + '<TEI id="TEI1">\n')
+            writer = PrettyXMLWriter(out, tei)
+            writer.element("teiHeader", push=True)
+            writer.element("fileDesc", push=True)
+            writer.element("titleStmt", push=True)
+            writer.element("title")
+            writer.text("PlainText")
+            writer.pop()
+            writer.element("publicationStmt", push=True)
+            for stmt, value in zip(PUBLICATION_STMT, stats.values()):
+                writer.element("idno", [("type", stmt)])
+                writer.text(value)
+            writer.pop()
+            writer.element("sourceDesc", push=True)
+            writer.element("p", [("Name", SOURCE)])
+            writer.close()
+            spool.seek(0)
+            shutil.copyfileobj(spool, out, SPOOL_SIZE)
+            out.write("</TEI>\n")
 
+def write_outputs(tokens, pred_file=None, tei_path=None):
+    """Write the corrected tokens to pred_file and/or a .tei file in one pass"""
+    if pred_file is not None:
+        tokens = write_prediction(tokens, pred_file)
+    try:
+        if tei_path is not None:
+            create_xml(tokens, tei_path)
+    finally:
+        # the corrected prediction is saved completely even if it is no valid TEI
+        for token in tokens:
+            pass
+
+if __name__ == "__main__":
+    args = p.parse_args()
+    with open(args.file + '_predict.txt', 'r') as file_pred:
+        prediction = file_pred.read().splitlines()
+    with open(args.file + '_graminput.txt', 'r') as file_network_input:
+        network_input = read_network_input(file_network_input.read().splitlines())
+        tokens = get_full_prediction(network_input, read_prediction(prediction))
+        # safe the corrected version of the prediction
+        with open(args.file + '_predict.txt',"w") as pred_file:
+            write_outputs(tokens, pred_file, args.file + ".tei")
@@ -0,0 +1,85 @@
+"""Write the discriminative oracle, the generative oracle, the (unkified) terminals
+for brown clustering and the vocabulary counts of a treebank in a single pass.
+
+The outputs are the same as those of get_oracle.py, get_oracle_gen.py,
+get_unkified_terminals.py (run on the generative oracle) and
+get_dictionary.py -o, but the treebank is only read and scanned once."""
+
+import argparse
+import io
+
+from get_oracle import check_balanced, OUTPUT_BUFFER_SIZE
+from tree_scanner import scan, OPEN_NT, TERMINAL
+from unk_signatures import unkify
+from vocabulary import Vocabulary, load_vocabulary
+
+ap = argparse.ArgumentParser(description='Write all oracle artifacts of a treebank in one pass')
+ap.add_argument('train_file', help='train treebank or vocabulary file saved by get_dictionary.py (for vocabulary mapping purposes)')
+ap.add_argument('treebank', help='treebank to prepare')
+ap.add_argument('--oracle', help='discriminative oracle output')
+ap.add_argument('--gen-oracle', help='generative oracle output')
+ap.add_argument('--terms', help='unkified terminals output (input for brown clustering)')
+ap.add_argument('--vocab', help='vocabulary counts of the treebank output')
+ap.add_argument('--min-count', type=int, help='minimum train count of a word to not be unkified')
+
+def scan_line(line):
+    """Return tags, tokens and actions of a treebank line from a single scan"""
+    tags = []
+    tokens = []
+    actions = []
+    for event, start, end, value in scan(line):
+        if event == OPEN_NT:
+            actions.append('NT(' + value + ')')
+        elif event == TERMINAL:
+            tags.append(value[0])
+            tokens.append(value[1])
+            actions.append('SHIFT')
+        else:
+            actions.append('REDUCE')
+    return tags, tokens, actions
+
+def open_artifact(path):
+    if path is None:
+        return None
+    return io.open(path, 'w', encoding='utf-8', newline='\n', buffering=OUTPUT_BUFFER_SIZE)
+
+def prepare_corpus(treebank_file, words_list, oracle=None, gen_oracle=None, terms=None):
+    """Write the artifacts of every line of treebank_file to the given open files
+    and return the vocabulary counts of the treebank"""
+    counts = {}
+    line_ctr = 0
+    for line in treebank_file:
+        line_ctr += 1
+        check_balanced(line, line_ctr)
+        tags, tokens, actions = scan_line(line)
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        tree = '# ' + line.rstrip()
+        tokens_line = ' '.join(tokens)
+        unkified_line = ' '.join(unkify(tokens, words_list))
+        actions_lines = '\n'.join(actions)
+        if oracle is not None:
+            oracle.write('\n'.join([tree, ' '.join(tags), tokens_line, tokens_line.lower(),
+                                    unkified_line, actions_lines, '', '']))
+        if gen_oracle is not None:
+            gen_oracle.write('\n'.join([tree, tokens_line, unkified_line, actions_lines, '', '']))
+        if terms is not None:
+            terms.write(unkified_line + '\n')
+    return Vocabulary(counts)
+
+def main():
+    args = ap.parse_args()
+    words_list = load_vocabulary(args.train_file, args.min_count)
+    outputs = [open_artifact(path) for path in (args.oracle, args.gen_oracle, args.terms)]
+    try:
+        with io.open(args.treebank, 'r', encoding='utf-8') as treebank_file:
+            counts = prepare_corpus(treebank_file, words_list, *outputs)
+    finally:
+        for output in outputs:
+            if output is not None:
+                output.close()
+    if args.vocab:
+        counts.save(args.vocab)
+
+if __name__ == '__main__':
+    main()
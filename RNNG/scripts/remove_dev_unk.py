@@ -1,43 +1,5 @@
 import sys
-
-def is_next_open_bracket(line, start_idx):
-    for char in line[(start_idx + 1):]:
-        if char == '(':
-            return True
-        elif char == ')':
-            return False
-    raise IndexError('Bracket possibly not balanced, open bracket not followed by closed bracket')
-
-def get_between_brackets(line, start_idx):
-    output = []
-    for char in line[(start_idx + 1):]:
-        if char == ')':
-            break
-        assert not(char == '(')
-        output.append(char)
-    return ''.join(output)
-
-def get_tags_tokens_lowercase(line):
-    output = []
-    #print 'curr line', line_strip
-    line_strip = line.rstrip()
-    #print 'length of the sentence', len(line_strip)
-    for i in range(len(line_strip)):
-        if i == 0:
-            assert line_strip[i] == '('
-        if line_strip[i] == '(' and not(is_next_open_bracket(line_strip, i)): # fulfilling this condition means this is a terminal symbol
-            output.append(get_between_brackets(line_strip, i))
-    #print 'output:',output
-    output_tags = []
-    output_tokens = []
-    output_lowercase = []
-    for terminal in output:
-        terminal_split = terminal.split()
-        assert len(terminal_split) == 2 # each terminal contains a POS tag and word        
-        output_tags.append(terminal_split[0])
-        output_tokens.append(terminal_split[1])
-        output_lowercase.append(terminal_split[1].lower())
-    return [output_tags, output_tokens, output_lowercase]
+from tree_scanner import get_tags_tokens_lowercase
 
 def main():
     if len(sys.argv) != 3:
@@ -0,0 +1,181 @@
+"""Compact outputs of the predicted s and seg spans
+
+The spans are collected from the corrected prediction tokens (the stream that
+prediction_to_XML.create_xml reads) and written in document order, outer spans
+first. Every span has a label, a depth (1 for spans that are not inside another
+s or seg), the token range [start, end) and the character and UTF-8 byte range
+[start, end) of those tokens in the original DATANAME.txt, so a consumer can
+memory-map the text and slice the spans out of it.
+
+DATANAME_spans.jsonl holds one JSON object per span. DATANAME.spans holds the
+same columns, all integers little-endian:
+
+    8 bytes   magic "RNNGSPN1"
+    u32       number of labels
+    u64       number of spans n
+    strings   labels, each as u32 length + UTF-8 bytes
+    padding   zero bytes up to a multiple of 8
+    u64       char start, char end, byte start, byte end [n each]
+    u32       token start, token end [n each]
+    u16       depth [n]
+    u8        label ids [n]
+"""
+
+import argparse
+import io
+import json
+import struct
+import sys
+from array import array
+
+from text_to_network_input import token_offsets, GERMAN, UNICODE
+
+MAGIC = b'RNNGSPN1'
+_HEADER = struct.Struct('<8sIQ')
+LABELS = ['s', 'seg']
+_OPENERS = dict(("(" + label, label_id) for label_id, label in enumerate(LABELS))
+_LEAVES = frozenset(["(w", "(c"])
+_OFFSET_COLUMNS = ('char_start', 'char_end', 'byte_start', 'byte_end')
+_COLUMNS = (('Q',) + _OFFSET_COLUMNS, ('I', 'token_start', 'token_end'), ('H', 'depth'), ('B', 'label'))
+
+ap = argparse.ArgumentParser(description='Write the s and seg spans of a corrected prediction')
+ap.add_argument('file', help='DATANAME; reads DATANAME.txt and the corrected DATANAME_predict.txt')
+ap.add_argument('--letters', choices=[GERMAN, UNICODE], default=GERMAN, help='letter policy the graminput was made with')
+
+def _column(typecode, values=()):
+    output = array(typecode, values)
+    assert output.itemsize == {'B': 1, 'H': 2, 'I': 4, 'Q': 8}[typecode]
+    return output
+
+class SpanCollector(object):
+    """Records the spans of the prediction tokens passed through collect"""
+
+    def __init__(self):
+        self.columns = dict((name, _column(typecode)) for typecode, *names in _COLUMNS for name in names
+                            if name not in _OFFSET_COLUMNS)
+        self.tokens = 0
+        self.open = []
+
+    def __len__(self):
+        return len(self.columns['label'])
+
+    def _close(self):
+        self.columns['token_end'][self.open.pop()] = self.tokens
+
+    def collect(self, tokens):
+        """Yield the tokens, recording the spans they open and close"""
+        tokens = iter(tokens)
+        previous = next(tokens)
+        yield previous
+        for token in tokens:
+            label_id = _OPENERS.get(token)
+            if label_id is not None:
+                self.open.append(len(self))
+                self.columns['label'].append(label_id)
+                self.columns['depth'].append(len(self.open))
+                self.columns['token_start'].append(self.tokens)
+                self.columns['token_end'].append(self.tokens)
+            elif token not in _LEAVES:
+                if previous in _LEAVES:
+                    self.tokens += 1
+                # the first bracket closes the token itself, brackets beyond
+                # the open spans close the outer (t
+                for i in range(min(token.count(")") - 1, len(self.open))):
+                    self._close()
+            previous = token
+            yield token
+        while self.open:
+            self._close()
+
+    def offset_columns(self, offsets):
+        """Return the char and byte offset columns of the spans, given the
+        token_offsets of the text"""
+        starts = [_column('Q') for _ in range(2)]
+        ends = [_column('Q') for _ in range(2)]
+        n_tokens = 0
+        for char_start, char_end, byte_start, byte_end in offsets:
+            starts[0].append(char_start)
+            starts[1].append(byte_start)
+            ends[0].append(char_end)
+            ends[1].append(byte_end)
+            n_tokens += 1
+        if n_tokens != self.tokens:
+            raise ValueError('The prediction has %d tokens, but the text %d' % (self.tokens, n_tokens))
+        columns = dict((name, _column('Q')) for name in _OFFSET_COLUMNS)
+        for token_start, token_end in zip(self.columns['token_start'], self.columns['token_end']):
+            for k, kind in enumerate(('char', 'byte')):
+                if token_end > token_start:
+                    start, end = starts[k][token_start], ends[k][token_end - 1]
+                elif token_start < n_tokens:
+                    # an empty span sits where its next token starts
+                    start = end = starts[k][token_start]
+                else:
+                    start = end = ends[k][-1] if n_tokens else 0
+                columns[kind + '_start'].append(start)
+                columns[kind + '_end'].append(end)
+        return columns
+
+def write_jsonl(columns, out):
+    """Write one JSON object per span to the open text file out"""
+    names = [name for typecode, *names in _COLUMNS for name in names]
+    for values in zip(*(columns[name] for name in names)):
+        span = dict(zip(names, values))
+        span['label'] = LABELS[span['label']]
+        out.write(json.dumps(span, sort_keys=True) + '\n')
+
+def write_binary(columns, output_file):
+    """Write the span columns to the open binary output_file"""
+    labels = b''.join(struct.pack('<I', len(label.encode('utf-8'))) + label.encode('utf-8') for label in LABELS)
+    header = _HEADER.pack(MAGIC, len(LABELS), len(columns['label']))
+    output_file.write(header)
+    output_file.write(labels)
+    output_file.write(b'\0' * (-(len(header) + len(labels)) % 8))
+    for typecode, *names in _COLUMNS:
+        for name in names:
+            values = _column(typecode, columns[name])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            values.tofile(output_file)
+
+def read_binary(path):
+    """Return the labels and the columns (name -> array) of a .spans file"""
+    with open(path, 'rb') as binary_file:
+        data = binary_file.read()
+    magic, n_labels, n_spans = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(path + ' is not a span file')
+    offset = _HEADER.size
+    labels = []
+    for _ in range(n_labels):
+        length, = struct.unpack_from('<I', data, offset)
+        labels.append(data[offset + 4:offset + 4 + length].decode('utf-8'))
+        offset += 4 + length
+    offset += -offset % 8
+    columns = {}
+    for typecode, *names in _COLUMNS:
+        for name in names:
+            values = _column(typecode)
+            values.frombytes(data[offset:offset + n_spans * values.itemsize])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            columns[name] = values
+            offset += n_spans * values.itemsize
+    return labels, columns
+
+def write_spans(collector, document, letters=GERMAN):
+    """Write DATANAME_spans.jsonl and DATANAME.spans of a collected prediction"""
+    with io.open(document + '.txt', 'r', encoding='utf-8', newline='') as txt_file:
+        columns = collector.offset_columns(token_offsets(txt_file, letters=letters))
+    columns.update(collector.columns)
+    with io.open(document + '_spans.jsonl', 'w', encoding='utf-8') as jsonl_file:
+        write_jsonl(columns, jsonl_file)
+    with open(document + '.spans', 'wb') as binary_file:
+        write_binary(columns, binary_file)
+
+if __name__ == '__main__':
+    args = ap.parse_args()
+    collector = SpanCollector()
+    with io.open(args.file + '_predict.txt', 'r', encoding='utf-8') as pred_file:
+        for token in collector.collect(pred_file.read().split(' ')):
+            pass
+    write_spans(collector, args.file, args.letters)
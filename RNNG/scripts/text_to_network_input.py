@@ -1,47 +1,142 @@
 import argparse
+import re
+
+CHUNK_SIZE = 1 << 16
+OUTPUT_BUFFER_SIZE = 1 << 20
+WORD_CHARS = "QWERTZUIOPÜASDFGHJKLÖÄYXCVBNMqwertzuiopüasdfghjklöäyxcvbnmß1234567890"
+# letter policies: the German alphabet above or every Unicode letter and digit
+GERMAN = 'german'
+UNICODE = 'unicode'
 
 ap = argparse.ArgumentParser()
 ap.add_argument('filename')
+ap.add_argument('--max-window', type=int, default=0, help='split the document into lines of at most this many tokens, cut at sentence ends where possible (0: one line)')
+ap.add_argument('--letters', choices=[GERMAN, UNICODE], default=GERMAN, help='characters that form words, all others become (c ...) tokens')
 #filename = "C:/Users/pasca/Dropbox/PaktikumTextimaging/rnng-master/Franz_Kafka_Das_Urteil"
 
+def read_chunks(txt_file, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = txt_file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def token_pattern(letters=GERMAN):
+    """Compile the classifier of a letter policy: runs of word characters become
+    one (w ...) token, every other non-whitespace character a (c ...) token"""
+    if letters == GERMAN:
+        word_class = '[' + re.escape(WORD_CHARS) + ']'
+    elif letters == UNICODE:
+        word_class = r'[^\W_]' # any Unicode letter or digit
+    else:
+        raise ValueError('Unknown letter policy: ' + letters)
+    return re.compile('(' + word_class + r'+)|(\S)')
+
+# brackets would break the tree structure
+_CHAR_REPLACEMENTS = {"(": "[", ")": "]"}
+
+def word_chunks(txt_file, chunk_size=CHUNK_SIZE):
+    """Yield (text, end) for the chunks of a text file: text[:end] ends at a
+    whitespace (or the end of the file), so no word is split, and the rest
+    text[end:] starts the next text"""
+    carry = ''
+    for chunk in read_chunks(txt_file, chunk_size):
+        text = carry + chunk
+        # the last word may continue in the next chunk
+        end = len(text)
+        while end > 0 and not text[end - 1].isspace():
+            end -= 1
+        carry = text[end:]
+        yield text, end
+    yield carry, len(carry)
+
+def _tokens(pattern, text, end):
+    for word, char in pattern.findall(text, 0, end):
+        if word:
+            yield "(w " + word + ")"
+        else:
+            yield "(c " + _CHAR_REPLACEMENTS.get(char, char) + ")"
+
+def tokenize(txt_file, chunk_size=CHUNK_SIZE, letters=GERMAN):
+    """Yield the graminput tokens of a text file, reading it in chunks"""
+    pattern = token_pattern(letters)
+    for text, end in word_chunks(txt_file, chunk_size):
+        for token in _tokens(pattern, text, end):
+            yield token
+
+def _offsets(pattern, text, end, char_base, byte_base):
+    position = 0
+    for match in pattern.finditer(text, 0, end):
+        byte_base += len(text[position:match.start()].encode('utf-8'))
+        byte_end = byte_base + len(match.group().encode('utf-8'))
+        yield char_base + match.start(), char_base + match.end(), byte_base, byte_end
+        byte_base = byte_end
+        position = match.end()
+
+def token_offsets(txt_file, chunk_size=CHUNK_SIZE, letters=GERMAN):
+    """Yield (char start, char end, byte start, byte end) of every token of tokenize.
+    The offsets count characters resp. UTF-8 bytes of the file, so txt_file
+    should be opened with newline='' to keep its line ends."""
+    pattern = token_pattern(letters)
+    char_base = byte_base = 0
+    for text, end in word_chunks(txt_file, chunk_size):
+        for offsets in _offsets(pattern, text, end, char_base, byte_base):
+            yield offsets
+        char_base += end
+        byte_base += len(text[:end].encode('utf-8'))
+
+# default maximum number of tokens per window of the prediction scripts
+MAX_WINDOW = 500
+# a window may end after these tokens (and closing quotes directly following them)
+SENTENCE_ENDS = frozenset(["(c .)", "(c ?)", "(c !)"])
+CLOSING_QUOTES = frozenset(["(c «)", "(c “)", "(c \")", "(c ‹)", "(c ‘)"])
+
+def segment(tokens, max_tokens):
+    """Group the token stream into windows of at most max_tokens tokens. A window
+    is cut after its last sentence end, or after max_tokens tokens if it has none.
+    A closing quote right after the sentence end that fills a window still goes
+    into that window, which then has max_tokens + 1 tokens."""
+    window = []
+    safe = 0 # window[:safe] ends with a sentence end
+    full = False
+    for token in tokens:
+        if full:
+            if token in CLOSING_QUOTES and safe == len(window):
+                window.append(token)
+                safe = len(window)
+                token = None
+            cut = safe if safe > 0 else len(window)
+            yield window[:cut]
+            window = window[cut:]
+            safe = 0
+            full = False
+            if token is None:
+                continue
+        window.append(token)
+        if token in SENTENCE_ENDS or (token in CLOSING_QUOTES and safe == len(window) - 1 and safe > 0):
+            safe = len(window)
+        full = len(window) >= max_tokens
+    if full and 0 < safe < len(window):
+        yield window[:safe]
+        window = window[safe:]
+    if window:
+        yield window
+
+def write_graminput(tokens, target_file, max_tokens=0):
+    """Write the tokens as one (t ...) line, or as one line per window if max_tokens > 0"""
+    windows = segment(tokens, max_tokens) if max_tokens > 0 else [tokens]
+    first = True
+    for window in windows:
+        target_file.write("(t" if first else "\n(t")
+        for token in window:
+            target_file.write(" " + token)
+        target_file.write(")")
+        first = False
+
 if __name__ == "__main__":
     args = ap.parse_args()
-    txt_file = open(args.filename, 'r')
-    #txt_file = open(filename +".txt", 'r')
-    target_file = open(args.filename[:-4] + "_graminput.txt", 'w')
-    #target_file = open(filename + "_graminput.txt", 'w')
-    whole_txt_splitted = txt_file.read().split(" ")
-    gram_str = "(t"
-    for word in whole_txt_splitted:
-        if word == '':
-            continue
-        i = 0
-        last_i = 0
-        while i < len(word):
-            if word[i] not in "QWERTZUIOPÜASDFGHJKLÖÄYXCVBNMqwertzuiopüasdfghjklöäyxcvbnmß1234567890":
-                if word[last_i:i] != "":
-                    gram_str += " (w " + word[last_i:i] + ")"
-                gram_str += " (c " + ("[" if word[i] == "(" else ("]" if word[i] == ")" else word[i])) + ")"
-                last_i = i+1
-            i += 1    
-        if word[last_i:i] != '':
-            gram_str += " (w " + word[last_i:i] + ")"
-    gram_str.replace("  ", " ")
-    """start_bracket = False
-    start_word = False
-    total = True
-    for i in range(len(gram_str)):
-        if start_word:
-            if gram_str[i] == ")":
-                start_bracket = False
-                start_word = False
-            elif gram_str[i] not in " QWERTZUIOPÜASDFGHJKLÖÄYXCVBNMqwertzuiopüasdfghjklöäyxcvbnmß1234567890":
-                print(i, "Example: ", gram_str[i-30:i+30])
-                total = False
-        if start_bracket and not start_word and gram_str[i] == "w":
-            start_word = True
-        if gram_str[i] == "(":
-            start_bracket = True"""
-    #print(whole_txt_splitted[-40:])
-    #print(gram_str)
-    target_file.write(gram_str + ")")
+    with open(args.filename, 'r') as txt_file:
+        #txt_file = open(filename +".txt", 'r')
+        with open(args.filename[:-4] + "_graminput.txt", 'w', buffering=OUTPUT_BUFFER_SIZE) as target_file:
+            #target_file = open(filename + "_graminput.txt", 'w')
+            write_graminput(tokenize(txt_file, letters=args.letters), target_file, args.max_window)
@@ -0,0 +1,70 @@
+"""Single-pass scanner for bracketed trees like (t (s (w Es) (c .)))
+
+Every bracket of a line is visited exactly once, so scanning is linear in the
+length of the line, no matter how many tokens a document has.
+"""
+import re
+
+# event types
+OPEN_NT = 'NT'
+TERMINAL = 'TERMINAL'
+CLOSE = 'CLOSE'
+
+_BRACKETS = re.compile(r'[()]')
+
+def scan(line):
+    """Yield (event, start, end, value) for every node of a bracketed tree.
+
+    start/end are the offsets of the opening and closing bracket in line.
+    value is the nonterminal label for OPEN_NT, the (tag, word) pair for
+    TERMINAL and None for CLOSE (end == start for OPEN_NT and CLOSE)."""
+    line = line.rstrip()
+    if len(line) > 0:
+        assert line[0] == '('
+    brackets = [m.start() for m in _BRACKETS.finditer(line)]
+    n = len(brackets)
+    k = 0
+    while k < n:
+        start = brackets[k]
+        if line[start] == ')':
+            yield (CLOSE, start, start, None)
+            k += 1
+            continue
+        if k + 1 == n:
+            raise IndexError('Bracket possibly not balanced, open bracket not followed by closed bracket')
+        end = brackets[k + 1]
+        if line[end] == '(': # open non-terminal
+            label_end = line.find(' ', start + 1, end)
+            assert label_end != -1
+            yield (OPEN_NT, start, start, line[start + 1:label_end])
+            k += 1
+        else: # terminal symbol
+            terminal_split = line[start + 1:end].split()
+            assert len(terminal_split) == 2 # each terminal contains a POS tag and word
+            yield (TERMINAL, start, end, (terminal_split[0], terminal_split[1]))
+            k += 2
+
+def get_terminals(line):
+    """Return the (tag, word) pairs of all terminals of line"""
+    return [value for event, start, end, value in scan(line) if event == TERMINAL]
+
+def get_tags_tokens_lowercase(line):
+    output_tags = []
+    output_tokens = []
+    output_lowercase = []
+    for tag, token in get_terminals(line):
+        output_tags.append(tag)
+        output_tokens.append(token)
+        output_lowercase.append(token.lower())
+    return [output_tags, output_tokens, output_lowercase]
+
+def get_actions(line):
+    output_actions = []
+    for event, start, end, value in scan(line):
+        if event == OPEN_NT:
+            output_actions.append('NT(' + value + ')')
+        elif event == TERMINAL:
+            output_actions.append('SHIFT')
+        else:
+            output_actions.append('REDUCE')
+    return output_actions
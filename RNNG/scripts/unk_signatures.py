@@ -0,0 +1,111 @@
+"""Cached UNK signatures (UNK-INITC-KNOWNLC-s, UNK-LC-ing, ...) for unknown tokens"""
+
+import functools
+
+CACHE_SIZE = 1 << 16
+
+# suffix rules in priority order, only checked for lowercased tokens of length >= 5
+SUFFIX_RULES = (('ed', '-ed'), ('ing', '-ing'), ('ion', '-ion'), ('er', '-er'), ('est', '-est'),
+                ('ly', '-ly'), ('ity', '-ity'), ('y', '-y'), ('al', '-al'))
+
+def _compile_suffix_rules(rules):
+    """Group the rules by their last character, keeping their priority order"""
+    table = {}
+    for suffix, signature in rules:
+        table.setdefault(suffix[-1], []).append((suffix, signature))
+    return dict((last, tuple(suffix_rules)) for last, suffix_rules in table.items())
+
+SUFFIX_TABLE = _compile_suffix_rules(SUFFIX_RULES)
+
+class UnkSignatures(object):
+    """Maps tokens to themselves if they are in words_dict and to their UNK
+    signature otherwise. Signatures are memoized in a bounded LRU cache."""
+
+    def __init__(self, words_dict, cache_size=CACHE_SIZE):
+        self.words_dict = words_dict
+        self.cache_size = cache_size
+        self.signature = functools.lru_cache(maxsize=cache_size)(self._signature)
+
+    def _signature(self, token):
+        numCaps = 0
+        hasDigit = False
+        hasDash = False
+        hasLower = False
+        for char in token:
+            if char.isdigit():
+                hasDigit = True
+            elif char == '-':
+                hasDash = True
+            elif char.isalpha():
+                if char.islower():
+                    hasLower = True
+                elif char.isupper():
+                    numCaps += 1
+        result = 'UNK'
+        lower = token.lower()
+        ch0 = token[0]
+        if ch0.isupper():
+            if numCaps == 1:
+                result = result + '-INITC'
+                if lower in self.words_dict:
+                    result = result + '-KNOWNLC'
+            else:
+                result = result + '-CAPS'
+        elif not(ch0.isalpha()) and numCaps > 0:
+            result = result + '-CAPS'
+        elif hasLower:
+            result = result + '-LC'
+        if hasDigit:
+            result = result + '-NUM'
+        if hasDash:
+            result = result + '-DASH'
+        if lower[-1] == 's' and len(lower) >= 3:
+            ch2 = lower[-2]
+            if not(ch2 == 's') and not(ch2 == 'i') and not(ch2 == 'u'):
+                result = result + '-s'
+        elif len(lower) >= 5 and not(hasDash) and not(hasDigit and numCaps > 0):
+            for suffix, signature in SUFFIX_TABLE.get(lower[-1], ()):
+                if lower.endswith(suffix):
+                    result = result + signature
+                    break
+        return result
+
+    def unkify(self, tokens):
+        final = []
+        for token in tokens:
+            token = token.rstrip()
+            # only process the train singletons and unknown words
+            if len(token) == 0:
+                final.append('UNK')
+            elif not(token in self.words_dict):
+                final.append(self.signature(token))
+            else:
+                final.append(token)
+        return final
+
+    def cache_stats(self):
+        """Return (hits, misses, current size, maximum size) of the signature cache"""
+        info = self.signature.cache_info()
+        return info.hits, info.misses, info.currsize, info.maxsize
+
+    def format_cache_stats(self):
+        hits, misses, size, maxsize = self.cache_stats()
+        lookups = hits + misses
+        hit_rate = 100.0 * hits / lookups if lookups > 0 else 0.0
+        return 'UNK signature cache: %d hits, %d misses (%.1f%% hit rate), %d/%d entries' % (
+            hits, misses, hit_rate, size, maxsize)
+
+# engine of the vocabulary used last, so unkify() keeps its cache between calls
+_signatures = None
+
+def get_signatures(words_dict, cache_size=None):
+    """Return the engine of words_dict, creating it if necessary"""
+    global _signatures
+    if (_signatures is None or _signatures.words_dict is not words_dict
+            or (cache_size is not None and _signatures.cache_size != cache_size)):
+        _signatures = UnkSignatures(words_dict, CACHE_SIZE if cache_size is None else cache_size)
+    return _signatures
+
+# tokens is a list of tokens, so no need to split it again
+def unkify(tokens, words_dict):
+    return get_signatures(words_dict).unkify(tokens)
@@ -0,0 +1,75 @@
+"""Hashed training vocabulary, which can be saved once and loaded by the oracle scripts"""
+
+import io
+
+from tree_scanner import get_terminals
+
+MAGIC = '#RNNG-VOCAB'
+VERSION = 1
+MIN_COUNT = 2 # words seen only once in training are unkified
+
+class Vocabulary(object):
+    """Word counts of a treebank. Membership tests are hash lookups in the set
+    of words seen at least min_count times."""
+
+    def __init__(self, counts=None, min_count=MIN_COUNT):
+        self.counts = counts if counts is not None else {}
+        self.min_count = min_count
+        self.words = set(word for word, count in self.counts.items() if count >= min_count)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        # words in the order they were first seen
+        for word in self.counts:
+            if word in self.words:
+                yield word
+
+    def count(self, word):
+        return self.counts.get(word, 0)
+
+    @classmethod
+    def from_treebank(cls, lines, min_count=MIN_COUNT):
+        counts = {}
+        for line in lines:
+            for tag, word in get_terminals(line):
+                counts[word] = counts.get(word, 0) + 1
+        return cls(counts, min_count)
+
+    def save(self, path):
+        """Write one "count word" line per word below a header line.
+        All counts are kept, so the artifact can be loaded with another min_count."""
+        with io.open(path, 'w', encoding='utf-8', newline='\n') as vocab_file:
+            vocab_file.write(u'%s %d %d\n' % (MAGIC, VERSION, self.min_count))
+            vocab_file.write(u''.join(u'%d %s\n' % (count, word) for word, count in self.counts.items()))
+
+    @classmethod
+    def load(cls, path, min_count=None):
+        with io.open(path, 'r', encoding='utf-8', newline='\n') as vocab_file:
+            header = vocab_file.readline().split()
+            if len(header) != 3 or header[0] != MAGIC:
+                raise ValueError(path + ' is not a vocabulary file')
+            if int(header[1]) != VERSION:
+                raise ValueError('Unsupported vocabulary version ' + header[1] + ' in ' + path)
+            if min_count is None:
+                min_count = int(header[2])
+            counts = {}
+            for line in vocab_file:
+                count, word = line.rstrip('\n').split(' ', 1)
+                counts[word] = int(count)
+        return cls(counts, min_count)
+
+def is_vocabulary_file(path):
+    with io.open(path, 'r', encoding='utf-8', errors='replace') as candidate:
+        return candidate.read(len(MAGIC)) == MAGIC
+
+def load_vocabulary(path, min_count=None):
+    """Load a saved vocabulary, or count the words of a train treebank"""
+    if is_vocabulary_file(path):
+        return Vocabulary.load(path, min_count)
+    with open(path, 'r') as train_file:
+        return Vocabulary.from_treebank(train_file, MIN_COUNT if min_count is None else min_count)
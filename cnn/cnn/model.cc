@@ -22,8 +22,10 @@ namespace cnn {
 
 ParametersBase::~ParametersBase() {}
 
-Parameters::Parameters(const Dim& d, float scale) : dim(d) {
+Parameters::Parameters(const Dim& d, float scale, bool external) : dim(d) {
   values.d = g.d = d;
+  values.v = g.v = nullptr;
+  if (external) return;
   values.v = static_cast<float*>(ps->allocate(d.size() * sizeof(float)));
   if (scale) {
     TensorTools::Randomize(values, scale);
@@ -74,10 +76,12 @@ void Parameters::clear() {
   TensorTools::Zero(g);
 }
 
-LookupParameters::LookupParameters(unsigned n, const Dim& d) : dim(d), values(n), grads(n) {
+LookupParameters::LookupParameters(unsigned n, const Dim& d, bool external) : dim(d), values(n), grads(n) {
   for (unsigned i = 0; i < n; ++i) {
     auto& v = values[i];
-    v.d = d;
+    v.d = grads[i].d = d;
+    v.v = grads[i].v = nullptr;
+    if (external) continue;
     v.v = static_cast<float*>(ps->allocate(d.size() * sizeof(float)));
     TensorTools::Randomize(v);
 
@@ -199,14 +203,14 @@ float Model::gradient_l2_norm() const {
 }
 
 Parameters* Model::add_parameters(const Dim& d, float scale) {
-  Parameters* p = new Parameters(d, scale);
+  Parameters* p = new Parameters(d, scale, external_values);
   all_params.push_back(p);
   params.push_back(p);
   return p;
 }
 
 LookupParameters* Model::add_lookup_parameters(unsigned n, const Dim& d) {
-  LookupParameters* p = new LookupParameters(n,d);
+  LookupParameters* p = new LookupParameters(n, d, external_values);
   all_params.push_back(p);
   lookup_params.push_back(p);
   return p;
@@ -45,7 +45,7 @@ struct Parameters : public ParametersBase {
   Tensor g;
  private:
   Parameters() {}
-  explicit Parameters(const Dim& d, float minmax); // initialize with ~U(-minmax,+minmax)
+  explicit Parameters(const Dim& d, float minmax, bool external = false); // initialize with ~U(-minmax,+minmax)
                                  // or Glorot initialization if minmax = 0
   friend class boost::serialization::access;
   template<class Archive> void serialize(Archive& ar, const unsigned int) {
@@ -74,7 +74,7 @@ struct LookupParameters : public ParametersBase {
   std::unordered_set<unsigned> non_zero_grads;
  private:
   LookupParameters() {}
-  LookupParameters(unsigned n, const Dim& d);
+  LookupParameters(unsigned n, const Dim& d, bool external = false);
   friend class boost::serialization::access;
   template<class Archive>
   void save(Archive& ar, const unsigned int) const {
@@ -102,8 +102,12 @@ struct LookupParameters : public ParametersBase {
 // parameters know how to track their gradients, but any extra information (like velocity) will live here
 class Model {
  public:
-  Model() : gradient_norm_scratch() {}
+  Model() : gradient_norm_scratch(), external_values() {}
   ~Model();
+  // parameters added while this is set get no memory in the parameter pool, neither
+  // for values nor for gradients: their values must be pointed at external memory
+  // (e.g. a memory-mapped file) before they are used, and they cannot be trained
+  void set_external_values(bool external) { external_values = external; }
   float gradient_l2_norm() const;
   void reset_gradient();
   // set scale to use custom initialization
@@ -150,6 +154,7 @@ class Model {
   std::vector<Parameters*> params;
   std::vector<LookupParameters*> lookup_params;
   mutable float* gradient_norm_scratch;
+  bool external_values;
 };
 
 void save_cnn_model(std::string filename, Model* model);